@@ -0,0 +1,56 @@
+set -eu
+umask 077
+SECRETS_DIR="${SECRETS_DIR:-/mnt/secrets}"
+OUT_FILE="${OUT_FILE:-/work/.env}"
+: > "$OUT_FILE"
+if [ ! -d "$SECRETS_DIR" ]; then
+  echo "Secrets directory not found: $SECRETS_DIR" >&2
+  exit 1
+fi
+# Emit KEY="value" lines; multiline values are escaped as \n.
+# Output is byte-identical to dotenv-writer-loop.sh, but a single awk process
+# reads every secret instead of forking basename and sed per file.
+# Collect regular files with shell builtins only; glob order matches the loop writer.
+set --
+for file in "$SECRETS_DIR"/*; do
+  if [ -f "$file" ]; then
+    set -- "$@" "$file"
+  fi
+done
+if [ "$#" -gt 0 ]; then
+  awk '
+    # The loop writer only escapes backslashes and quotes on the first line
+    # of a value (sed branches past those expressions after N); keep parity.
+    function escape(s,    out, i, c) {
+      out = ""
+      for (i = 1; i <= length(s); i++) {
+        c = substr(s, i, 1)
+        if (c == "\\" || c == "\"") {
+          out = out "\\"
+        }
+        out = out c
+      }
+      return out
+    }
+    BEGIN {
+      for (i = 1; i < ARGC; i++) {
+        path = ARGV[i]
+        key = path
+        sub(/.*\//, "", key)
+        value = ""
+        lines = 0
+        while ((status = (getline line < path)) > 0) {
+          value = lines++ ? value "\\n" line : escape(line)
+        }
+        if (status < 0) {
+          printf "Failed to read %s\n", path > "/dev/stderr"
+          exit 1
+        }
+        close(path)
+        printf "%s=\"%s\"\n", key, value
+      }
+    }
+  ' "$@" >> "$OUT_FILE"
+fi
+# Ensure non-root runtime users (for example www-data) can read the file.
+chmod 0444 "$OUT_FILE"
@@ -0,0 +1,21 @@
+set -eu
+umask 077
+SECRETS_DIR="${SECRETS_DIR:-/mnt/secrets}"
+OUT_FILE="${OUT_FILE:-/work/.env}"
+: > "$OUT_FILE"
+if [ ! -d "$SECRETS_DIR" ]; then
+  echo "Secrets directory not found: $SECRETS_DIR" >&2
+  exit 1
+fi
+# Emit KEY="value" lines; multiline values are escaped as \n.
+# CSI mounts expose keys as symlinks under /mnt/secrets.
+# Iterate directory entries directly so this works across BusyBox/GNU tools.
+for file in "$SECRETS_DIR"/*; do
+  [ -e "$file" ] || continue
+  [ -f "$file" ] || continue
+  key="$(basename "$file")"
+  escaped="$(sed -e 's/\\/\\\\/g' -e 's/"/\\"/g' -e ':a;N;$!ba;s/\n/\\n/g' "$file")"
+  printf '%s="%s"\n' "$key" "$escaped" >> "$OUT_FILE"
+done
+# Ensure non-root runtime users (for example www-data) can read the file.
+chmod 0444 "$OUT_FILE"
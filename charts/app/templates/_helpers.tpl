@@ -75,6 +75,45 @@ imagePullSecrets:
 {{- printf "%s-dotenv" $workload.name | trunc 63 | trimSuffix "-" -}}
 {{- end -}}
 
+{{- define "app.dotenvWriterContainer" -}}
+{{- $root := index . 0 -}}
+{{- $workload := index . 1 -}}
+{{- $csiMountPath := default "/mnt/secrets" $workload.csi.mountPath -}}
+{{- $dotenv := default (dict) $workload.dotenv -}}
+{{- $writer := default "loop" $dotenv.writer -}}
+{{- $script := $root.Files.Get (printf "files/dotenv-writer-%s.sh" $writer) -}}
+{{- if not $script -}}
+{{- fail (printf "workload %s: unknown dotenv.writer %q" $workload.name $writer) -}}
+{{- end -}}
+- name: dotenv-writer
+  {{- if $dotenv.useAppImage }}
+  image: "{{ $workload.image.repository }}:{{ $workload.image.tag }}"
+  imagePullPolicy: {{ default "IfNotPresent" $workload.image.pullPolicy }}
+  {{- else }}
+  image: alpine:3.20
+  imagePullPolicy: IfNotPresent
+  {{- end }}
+  command:
+  - sh
+  - -ec
+  - |
+    {{- trim $script | nindent 4 }}
+  env:
+  - name: SECRETS_DIR
+    value: {{ $csiMountPath | quote }}
+  - name: OUT_FILE
+    value: /work/.env
+  volumeMounts:
+  - name: {{ include "app.csiVolumeName" (list $root $workload) }}
+    mountPath: {{ $csiMountPath | quote }}
+    readOnly: true
+  - name: {{ include "app.dotenvVolumeName" (list $root $workload) }}
+    mountPath: /work
+  {{- if eq (default "" $workload.qosClass) "Guaranteed" }}
+  {{- include "app.initContainerResources" $workload | nindent 2 }}
+  {{- end }}
+{{- end -}}
+
 {{- define "app.runtimeConfigVolumeName" -}}
 {{- $workload := index . 1 -}}
 {{- printf "%s-runtime-config" $workload.name | trunc 63 | trimSuffix "-" -}}
@@ -85,6 +124,73 @@ imagePullSecrets:
 {{- printf "%s-runtime-config" (include "app.workloadName" (list (index . 0) $workload)) | trunc 63 | trimSuffix "-" -}}
 {{- end -}}
 
+{{- define "app.runtimeConfigInflatedVolumeName" -}}
+{{- $workload := index . 1 -}}
+{{- printf "%s-runtime-config-inflated" $workload.name | trunc 63 | trimSuffix "-" -}}
+{{- end -}}
+
+{{- define "app.runtimeConfigShardName" -}}
+{{- /* Hash-named so content changes create a new immutable ConfigMap and roll the pods. */ -}}
+{{- $root := index . 0 -}}
+{{- $workload := index . 1 -}}
+{{- $shard := toString (index . 2) -}}
+{{- $files := list -}}
+{{- range $file := $workload.runtimeConfig.files -}}
+{{- if eq (toString (int (default 0 $file.shard))) $shard -}}
+{{- $files = append $files $file -}}
+{{- end -}}
+{{- end -}}
+{{- $suffix := printf "%s-%s" $shard (sha256sum (toJson $files) | trunc 10) -}}
+{{- $base := include "app.runtimeConfigMapName" (list $root $workload) | trunc (int (sub 62 (len $suffix))) | trimSuffix "-" -}}
+{{- printf "%s-%s" $base $suffix -}}
+{{- end -}}
+
+{{- define "app.runtimeConfigInflateContainer" -}}
+{{- $root := index . 0 -}}
+{{- $workload := index . 1 -}}
+- name: runtime-config-inflate
+  image: alpine:3.20
+  imagePullPolicy: IfNotPresent
+  command:
+  - sh
+  - -ec
+  - |
+    {{- range $file := $workload.runtimeConfig.files }}
+    {{- if and (eq (default "text" $file.encoding) "gzip") (not (hasKey $file "part")) }}
+    gzip -dc {{ printf "/runtime-config/%s.gz" $file.key | squote }} > {{ printf "/work/%s" $file.key | squote }}
+    {{- else if and (hasKey $file "part") (eq (int $file.part) 0) }}
+    {{- $parts := list -}}
+    {{- range $other := $workload.runtimeConfig.files -}}
+    {{- if and (eq $other.key $file.key) (hasKey $other "part") -}}
+    {{- $parts = append $parts (printf "/runtime-config/%s.part%d" $other.key (int $other.part) | squote) -}}
+    {{- end -}}
+    {{- end }}
+    cat {{ join " " $parts }} | gzip -dc > {{ printf "/work/%s" $file.key | squote }}
+    {{- end }}
+    {{- end }}
+    chmod 0444 /work/*
+  volumeMounts:
+  - name: {{ include "app.runtimeConfigVolumeName" (list $root $workload) }}
+    mountPath: /runtime-config
+    readOnly: true
+  - name: {{ include "app.runtimeConfigInflatedVolumeName" (list $root $workload) }}
+    mountPath: /work
+  {{- if eq (default "" $workload.qosClass) "Guaranteed" }}
+  {{- include "app.initContainerResources" $workload | nindent 2 }}
+  {{- end }}
+{{- end -}}
+
+{{- define "app.initContainerResources" -}}
+{{- /* Every container needs requests equal to limits for the pod to stay Guaranteed. */ -}}
+resources:
+  requests:
+    cpu: 50m
+    memory: 64Mi
+  limits:
+    cpu: 50m
+    memory: 64Mi
+{{- end -}}
+
 {{- define "app.tlsSecretName" -}}
 {{- $root := index . 0 -}}
 {{- $workload := index . 1 -}}
@@ -144,4 +250,4 @@ command:
   {{- end -}}
 {{- end -}}
 {{- end -}}
-
+
@@ -14,6 +14,8 @@ Supports the new payload shape:
 from __future__ import annotations
 
 import argparse
+import base64
+import gzip
 import json
 import os
 import re
@@ -23,11 +25,23 @@ from typing import Any
 
 import yaml
 
+from k8s_quantity import (
+    format_cpu,
+    format_memory,
+    parse_cpu,
+    parse_memory,
+    round_up_cpu,
+    round_up_memory,
+)
+
 try:
     import jsonschema
 except ImportError:  # pragma: no cover - validated in CI
     jsonschema = None
 
+# libyaml's emitter is several times faster; fall back when PyYAML lacks it.
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 DEFAULT_REPO_URL = "https://github.com/your-org/your-repo"
 DEFAULT_ENV = "dev"
@@ -38,18 +52,62 @@ DEFAULT_INGRESS_CLASS_NAME = "traefik"
 DEFAULT_CLUSTER_ISSUER = "letsencrypt-prod"
 DEFAULT_WORKING_DIRECTORY = "/app"
 DEFAULT_IMAGE_PULL_SECRET = "ghcr-pull"
+DEFAULT_SCHEMA_PATH = Path(__file__).resolve().parents[1] / "schemas" / "app-config.schema.json"
+# Must match the RollingSync steps in clusters/<env>/applications/apps/applicationset.yaml.
+ROLLOUT_GROUPS = ("canary", "default")
+DOTENV_WRITERS = {"loop", "awk"}
+# Kubernetes rejects ConfigMaps over 1 MiB; leave room for metadata.
+DEFAULT_RUNTIME_CONFIG_SHARD_BYTES = 900 * 1024
+DEFAULT_RUNTIME_CONFIG_COMPRESS_THRESHOLD = 64 * 1024
+CONFIGMAP_KEY_RE = re.compile(r"^[-._a-zA-Z0-9]+$")
+TRAFFIC_DISTRIBUTIONS = ("PreferClose", "PreferSameZone", "PreferSameNode")
+INTERNAL_TRAFFIC_POLICIES = ("Cluster", "Local")
+SESSION_AFFINITIES = ("None", "ClientIP")
+# Must match the shared classes in platform/priority-classes/priority-classes.yaml.
+# The default tier has no class (priority 0, like platform pods), so a fresh
+# cluster never rejects its pods while that Application is still syncing.
+PRIORITY_TIERS = ("latency-critical", "standard", "batch")
+PRIORITY_CLASS_PREFIX = "infrazero-"
+PRESET_PRIORITY_TIERS = {"web": "latency-critical", "queue": "standard", "scheduler": "batch"}
+DEFAULT_PRIORITY_TIER = "standard"
+QOS_CLASSES = ("Guaranteed", "Burstable")
+# standard keeps whatever the resources give (limits-only pods stay Guaranteed).
+TIER_QOS_CLASSES = {"latency-critical": "Guaranteed", "batch": "Burstable"}
+# plan_capacity.py imports these so derived requests match its preset catalog.
+DEFAULT_CPU_REQUEST_RATIO = 0.25
+DEFAULT_MEMORY_REQUEST_RATIO = 0.75
+# Must match the match stages in clusters/<env>/applications/platform/promtail.yaml.
+LOG_LEVEL_FLOORS = ("debug", "info", "warn", "error")
+LOG_SAMPLE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5)
+LOG_LEVEL_LABEL = "logging.infrazero.io/level"
+LOG_DROP_ANNOTATION = "logging.infrazero.io/drop"
+LOG_SAMPLE_ANNOTATION = "logging.infrazero.io/sample-rate"
+# Promtail evaluates drop patterns with Go RE2, which lacks these constructs.
+RE2_UNSUPPORTED_RE = re.compile(r"\(\?<?[=!]|\\[1-9]")
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Generate AppConfig from deployed_apps_json.")
     parser.add_argument("--deployed-apps-json", help="Raw deployed_apps_json payload.")
     parser.add_argument("--deployed-apps-file", help="Path to a JSON file with payload.")
-    parser.add_argument("--output", required=True, help="Path to write generated AppConfig YAML.")
+    parser.add_argument("--output", required=True, help="Path to write generated AppConfig.")
+    parser.add_argument(
+        "--output-format",
+        choices=sorted(WRITERS),
+        default="yaml",
+        help="Values file format; Helm and Argo CD read JSON values files too.",
+    )
     parser.add_argument("--schema", help="Optional schema path for post-generation validation.")
     parser.add_argument("--bootstrap-repo-url", default=DEFAULT_REPO_URL)
     parser.add_argument("--bootstrap-env", default=DEFAULT_ENV)
     parser.add_argument("--bootstrap-target-revision", default=DEFAULT_TARGET_REVISION)
     parser.add_argument("--bootstrap-argo-namespace", default=DEFAULT_ARGO_NAMESPACE)
+    parser.add_argument(
+        "--bootstrap-rollout-group",
+        choices=ROLLOUT_GROUPS,
+        default="default",
+        help="ApplicationSet RollingSync step; canary apps sync before the rest.",
+    )
     parser.add_argument("--namespace", help="Override Kubernetes namespace; defaults to app_name.")
     parser.add_argument("--base-domain", default=DEFAULT_BASE_DOMAIN)
     parser.add_argument("--ingress-class-name", default=DEFAULT_INGRESS_CLASS_NAME)
@@ -62,6 +120,44 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--tls-cluster-issuer", default=DEFAULT_CLUSTER_ISSUER)
     parser.add_argument("--default-container-port", type=int, default=8080)
     parser.add_argument("--default-service-port", type=int, default=80)
+    parser.add_argument(
+        "--resource-presets-file",
+        help="Optional YAML/JSON resourcePresets catalog (for example from plan_capacity.py).",
+    )
+    parser.add_argument(
+        "--cpu-request-ratio",
+        type=float,
+        default=DEFAULT_CPU_REQUEST_RATIO,
+        help="CPU request as a fraction of the limit for Burstable workloads without requests.",
+    )
+    parser.add_argument(
+        "--memory-request-ratio",
+        type=float,
+        default=DEFAULT_MEMORY_REQUEST_RATIO,
+        help="Memory request as a fraction of the limit for Burstable workloads without requests.",
+    )
+    parser.add_argument(
+        "--runtime-config-compress-threshold",
+        type=int,
+        default=DEFAULT_RUNTIME_CONFIG_COMPRESS_THRESHOLD,
+        help="Gzip runtime config files larger than this many bytes into binaryData.",
+    )
+    parser.add_argument(
+        "--runtime-config-shard-bytes",
+        type=int,
+        default=DEFAULT_RUNTIME_CONFIG_SHARD_BYTES,
+        help="Maximum stored bytes per runtime config ConfigMap shard.",
+    )
+    parser.add_argument(
+        "--infisical-url",
+        help="Infisical URL; with identity/project IDs the chart renders SecretProviderClasses.",
+    )
+    parser.add_argument("--infisical-identity-id", help="Machine identity ID for Kubernetes auth.")
+    parser.add_argument("--infisical-project-id", help="Infisical project ID.")
+    parser.add_argument(
+        "--infisical-env-slug",
+        help="Infisical environment slug; defaults to --bootstrap-env.",
+    )
     return parser.parse_args()
 
 
@@ -209,6 +305,420 @@ def build_secret_provider_class_name(seed: str) -> str:
     return f"infisical-{sanitized}"
 
 
+def normalize_secret_keys(value: Any, label: str) -> list[str]:
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        value = [part for part in re.split(r"[\s,]+", value) if part]
+    if not isinstance(value, list):
+        raise ValueError(f"{label} secret_keys must be a list or comma-separated string")
+    return [str(key).strip() for key in value if str(key).strip()]
+
+
+def build_infisical_settings(args: argparse.Namespace) -> dict[str, Any]:
+    settings = {
+        "url": (args.infisical_url or "").strip(),
+        "identityId": (args.infisical_identity_id or "").strip(),
+        "projectId": (args.infisical_project_id or "").strip(),
+    }
+    provided = [key for key, value in settings.items() if value]
+    if not provided:
+        return {}
+    missing = [key for key, value in settings.items() if not value]
+    if missing:
+        raise ValueError(
+            "--infisical-url, --infisical-identity-id and --infisical-project-id must be "
+            f"set together (missing: {', '.join(missing)})"
+        )
+    settings["envSlug"] = (args.infisical_env_slug or args.bootstrap_env).strip()
+    return settings
+
+
+def build_secret_provider_classes(
+    app_payload: dict[str, Any],
+    workload_payloads: list[dict[str, Any]],
+    normalized_workloads: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """Return one SecretProviderClass spec per distinct secrets folder.
+
+    Workloads sharing a folder share the class, so the union of their
+    secret_keys (plus the app-level secret_keys for the app folder) is mounted.
+    """
+    app_folder = str(
+        pick(app_payload, ["secrets_folder", "secretsFolder"], default="") or ""
+    ).strip()
+    app_keys = normalize_secret_keys(
+        pick(app_payload, ["secret_keys", "secretKeys"]), "app-level"
+    )
+    classes: dict[str, dict[str, Any]] = {}
+    for workload_payload, workload in zip(workload_payloads, normalized_workloads):
+        folder = workload.get("secretsFolder")
+        if not folder:
+            continue
+        name = workload["csi"]["secretProviderClass"]
+        entry = classes.setdefault(
+            name, {"name": name, "secretsFolder": folder, "keys": set()}
+        )
+        if entry["secretsFolder"] != folder:
+            raise ValueError(
+                f"Secrets folders '{entry['secretsFolder']}' and '{folder}' both map to "
+                f"SecretProviderClass '{name}'"
+            )
+        entry["keys"].update(
+            normalize_secret_keys(
+                pick(workload_payload, ["secret_keys", "secretKeys"]),
+                f"Workload '{workload['name']}'",
+            )
+        )
+        if folder == app_folder:
+            entry["keys"].update(app_keys)
+
+    result = []
+    for entry in classes.values():
+        if not entry["keys"]:
+            raise ValueError(
+                f"Secrets folder '{entry['secretsFolder']}' has no secret_keys; list the keys "
+                "to mount or omit the --infisical-* options"
+            )
+        result.append(
+            {
+                "name": entry["name"],
+                "secretsFolder": entry["secretsFolder"],
+                "secretPath": "/" + entry["secretsFolder"].strip("/"),
+                "keys": sorted(entry["keys"]),
+            }
+        )
+    return result
+
+
+def runtime_config_stored_name(item: dict[str, Any]) -> str:
+    """Key of a runtime config entry inside its ConfigMap (see workload-configmap.yaml)."""
+    if "part" in item:
+        return f"{item['key']}.part{item['part']}"
+    if item.get("encoding") == "gzip":
+        return f"{item['key']}.gz"
+    return item["key"]
+
+
+def normalize_runtime_config_files(
+    files: Any,
+    workload_name: str,
+    compress_threshold: int,
+    shard_bytes: int,
+) -> list[dict[str, Any]]:
+    """Normalize runtime config files and assign them to ConfigMap shards.
+
+    Files above compress_threshold are stored gzip'd (base64 in the values
+    file, binaryData in the ConfigMap) when that is smaller. A file that
+    still does not fit in one shard is gzip'd regardless and its compressed
+    bytes are split into numbered parts, which the inflate init container
+    concatenates before gunzip. Shards are filled first-fit in declaration
+    order so an edit only renames the shards whose content changed.
+    """
+    if not isinstance(files, list):
+        raise ValueError(f"Workload '{workload_name}' runtime_config_files must be a list")
+    if shard_bytes < 4:
+        raise ValueError("--runtime-config-shard-bytes must be at least 4")
+    normalized: list[dict[str, Any]] = []
+    seen_keys: set[str] = set()
+    seen_paths: set[str] = set()
+    shard_sizes: list[int] = []
+
+    def assign(item: dict[str, Any], content: str) -> None:
+        # The 1 MiB object limit counts bytes: UTF-8 for data, and the base64
+        # text (already ASCII) for binaryData.
+        size = len(content.encode("utf-8"))
+        for index, used in enumerate(shard_sizes):
+            if used + size <= shard_bytes:
+                shard = index
+                break
+        else:
+            shard = len(shard_sizes)
+            shard_sizes.append(0)
+        shard_sizes[shard] += size
+        item["shard"] = shard
+        item["content"] = content
+        normalized.append(item)
+
+    for entry in files:
+        if not isinstance(entry, dict):
+            raise ValueError(f"Workload '{workload_name}' runtime config entries must be objects")
+        mount_path = str(pick(entry, ["mount_path", "mountPath"], default="") or "").strip()
+        if not mount_path.startswith("/") or mount_path.endswith("/"):
+            raise ValueError(
+                f"Workload '{workload_name}' runtime config mount_path must be an absolute "
+                f"file path, got '{mount_path}'"
+            )
+        key = str(pick(entry, ["key", "name"], default="") or "").strip() or mount_path.rsplit("/", 1)[1]
+        if not CONFIGMAP_KEY_RE.match(key):
+            raise ValueError(f"Workload '{workload_name}' runtime config key '{key}' is invalid")
+        if key in seen_keys or mount_path in seen_paths:
+            raise ValueError(
+                f"Workload '{workload_name}' has duplicate runtime config key/path '{key}'"
+            )
+        seen_keys.add(key)
+        seen_paths.add(mount_path)
+
+        content = str(pick(entry, ["content"], default="") or "")
+        raw = content.encode("utf-8")
+        item: dict[str, Any] = {"key": key, "mountPath": mount_path}
+        if len(raw) > compress_threshold or len(raw) > shard_bytes:
+            # mtime=0 keeps the output, and therefore the ConfigMap name, stable.
+            packed = gzip.compress(raw, compresslevel=9, mtime=0)
+            encoded = base64.b64encode(packed).decode("ascii")
+            if len(encoded) > shard_bytes:
+                # Whole base64 quanta per part so each part decodes on its own.
+                chunk = shard_bytes // 4 * 3
+                for part, offset in enumerate(range(0, len(packed), chunk)):
+                    data = base64.b64encode(packed[offset : offset + chunk]).decode("ascii")
+                    assign({**item, "encoding": "gzip", "part": part}, data)
+                continue
+            if len(encoded) < len(raw):
+                content = encoded
+                item["encoding"] = "gzip"
+        assign(item, content)
+
+    owners: dict[str, str] = {}
+    for item in normalized:
+        stored = runtime_config_stored_name(item)
+        if owners.setdefault(stored, item["key"]) != item["key"]:
+            raise ValueError(
+                f"Workload '{workload_name}' runtime config key '{item['key']}' and "
+                f"'{owners[stored]}' are both stored as '{stored}'"
+            )
+    return normalized
+
+
+def normalize_choice(value: Any, choices: tuple[str, ...], label: str) -> str:
+    """Match a payload value case-insensitively (ignoring - and _) to an API enum."""
+    text = str(value or "").strip()
+    if not text:
+        return ""
+    wanted = re.sub(r"[-_\s]", "", text).lower()
+    for choice in choices:
+        if re.sub(r"[-_\s]", "", choice).lower() == wanted:
+            return choice
+    raise ValueError(f"{label} must be one of {', '.join(choices)}; got '{text}'")
+
+
+def normalize_service(
+    workload_payload: dict[str, Any], workload_name: str, enabled: bool
+) -> dict[str, Any]:
+    service: dict[str, Any] = {
+        "enabled": enabled,
+        "type": "ClusterIP",
+        "annotations": {},
+    }
+    label = f"Workload '{workload_name}'"
+    traffic_distribution = normalize_choice(
+        pick(workload_payload, ["traffic_distribution", "trafficDistribution"]),
+        TRAFFIC_DISTRIBUTIONS,
+        f"{label} traffic_distribution",
+    )
+    internal_traffic_policy = normalize_choice(
+        pick(workload_payload, ["internal_traffic_policy", "internalTrafficPolicy"]),
+        INTERNAL_TRAFFIC_POLICIES,
+        f"{label} internal_traffic_policy",
+    )
+    session_affinity = normalize_choice(
+        pick(workload_payload, ["session_affinity", "sessionAffinity"]),
+        SESSION_AFFINITIES,
+        f"{label} session_affinity",
+    )
+    timeout = pick(
+        workload_payload,
+        ["session_affinity_timeout_seconds", "sessionAffinityTimeoutSeconds"],
+    )
+    headless = to_bool(pick(workload_payload, ["headless"]), default=False)
+
+    if headless:
+        # Headless Services bypass kube-proxy, so proxy routing options never apply.
+        proxy_options = [
+            name
+            for name, value in (
+                ("traffic_distribution", traffic_distribution),
+                ("internal_traffic_policy", internal_traffic_policy),
+                ("session_affinity", session_affinity if session_affinity != "None" else ""),
+            )
+            if value
+        ]
+        if proxy_options:
+            raise ValueError(
+                f"{label}: {', '.join(proxy_options)} cannot be combined with headless"
+            )
+        service["headless"] = True
+    if traffic_distribution:
+        service["trafficDistribution"] = traffic_distribution
+    if internal_traffic_policy:
+        service["internalTrafficPolicy"] = internal_traffic_policy
+    if session_affinity:
+        service["sessionAffinity"] = session_affinity
+    if timeout is not None:
+        if session_affinity != "ClientIP":
+            raise ValueError(
+                f"{label} session_affinity_timeout_seconds requires session_affinity ClientIP"
+            )
+        timeout = int(timeout)
+        if not 0 < timeout <= 86400:
+            raise ValueError(f"{label} session_affinity_timeout_seconds must be 1-86400")
+        service["sessionAffinityTimeoutSeconds"] = timeout
+    return service
+
+
+def normalize_log_controls(
+    app_payload: dict[str, Any], workload_payload: dict[str, Any], workload_name: str
+) -> tuple[dict[str, str], dict[str, str]]:
+    """Return pod labels/annotations read by the promtail pipeline stages."""
+
+    def inherited(keys: list[str]) -> Any:
+        return pick(workload_payload, keys, default=pick(app_payload, keys))
+
+    label = f"Workload '{workload_name}'"
+    labels: dict[str, str] = {}
+    annotations: dict[str, str] = {}
+
+    level = str(inherited(["log_level", "logLevel"]) or "").strip().lower()
+    level = {"warning": "warn", "err": "error"}.get(level, level)
+    if level:
+        if level not in LOG_LEVEL_FLOORS:
+            raise ValueError(
+                f"{label} log_level must be one of {', '.join(LOG_LEVEL_FLOORS)}; got '{level}'"
+            )
+        labels[LOG_LEVEL_LABEL] = level
+
+    patterns = inherited(["log_drop_patterns", "logDropPatterns"]) or []
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    if not isinstance(patterns, list):
+        raise ValueError(f"{label} log_drop_patterns must be a list of regexes")
+    compiled = []
+    for pattern in patterns:
+        pattern = str(pattern)
+        if not pattern:
+            continue
+        if RE2_UNSUPPORTED_RE.search(pattern):
+            raise ValueError(f"{label} log_drop_patterns entry '{pattern}' is not RE2 compatible")
+        try:
+            re.compile(pattern)
+        except re.error as exc:
+            raise ValueError(
+                f"{label} log_drop_patterns entry '{pattern}' is invalid: {exc}"
+            ) from exc
+        compiled.append(f"(?:{pattern})")
+    if compiled:
+        annotations[LOG_DROP_ANNOTATION] = "|".join(compiled)
+
+    rate = inherited(["log_sample_rate", "logSampleRate"])
+    if rate is not None and rate != "":
+        try:
+            rate = float(rate)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"{label} log_sample_rate must be a number between 0 and 1") from exc
+        if not 0 < rate <= 1:
+            raise ValueError(f"{label} log_sample_rate must be greater than 0 and at most 1")
+        # Promtail sampling stages are static, so round up to the nearest bucket.
+        bucket = next((value for value in LOG_SAMPLE_BUCKETS if rate <= value), None)
+        if bucket is not None:
+            annotations[LOG_SAMPLE_ANNOTATION] = f"{bucket:g}"
+    return labels, annotations
+
+
+def normalize_priority_tier(workload_payload: dict[str, Any], preset: Any, workload_name: str) -> str:
+    tier = normalize_choice(
+        pick(workload_payload, ["priority_tier", "priorityTier"]),
+        PRIORITY_TIERS,
+        f"Workload '{workload_name}' priority_tier",
+    )
+    if tier:
+        return tier
+    return PRESET_PRIORITY_TIERS.get(str(preset or "").strip().lower(), DEFAULT_PRIORITY_TIER)
+
+
+def apply_qos_class(
+    item: dict[str, Any],
+    workload_payload: dict[str, Any],
+    tier: str,
+    resource_presets: dict[str, Any],
+    args: argparse.Namespace,
+) -> None:
+    """Shape requests so the pod lands in the tier's QoS class.
+
+    Guaranteed pins requests to limits (explicit or from the preset catalog).
+    An explicit qos_class rejects requests below the limits; the tier default
+    raises them with a warning. Burstable derives missing requests from
+    explicit limits by ratio. The standard tier leaves resources as they are.
+    """
+    label = f"Workload '{item['name']}'"
+    explicit = normalize_choice(
+        pick(workload_payload, ["qos_class", "qosClass"]), QOS_CLASSES, f"{label} qos_class"
+    )
+    qos_class = explicit or TIER_QOS_CLASSES.get(tier)
+    if not qos_class:
+        return
+    resources = item.get("resources", {})
+    requests = dict(resources.get("requests") or {})
+    limits = dict(resources.get("limits") or {})
+    parsers = {"cpu": parse_cpu, "memory": parse_memory}
+    preset = resource_presets.get(resources.get("preset") or "")
+    preset_fallback = not requests and not limits and isinstance(preset, dict)
+
+    if qos_class == "Guaranteed":
+        if preset_fallback:
+            limits = dict(preset.get("limits") or {})
+        if not {"cpu", "memory"} <= limits.keys():
+            if explicit:
+                raise ValueError(f"{label}: qos_class Guaranteed requires cpu and memory limits")
+            return
+        differing = sorted(
+            name
+            for name, value in requests.items()
+            if name not in limits or parsers[name](value) != parsers[name](limits[name])
+        )
+        if not differing:
+            item["resources"] = {"requests": dict(limits), "limits": limits}
+            item["qosClass"] = "Guaranteed"
+            return
+        if explicit:
+            raise ValueError(
+                f"{label}: qos_class Guaranteed requires requests equal to limits "
+                f"({', '.join(differing)} differ)"
+            )
+        print(
+            f"WARNING: {label}: raising {', '.join(differing)} requests to the limits because "
+            f"the {tier} tier is Guaranteed; set qos_class: Burstable to keep lower requests",
+            file=sys.stderr,
+        )
+        item["resources"] = {"requests": dict(limits), "limits": limits}
+        item["qosClass"] = "Guaranteed"
+        return
+
+    derived = {
+        "cpu": lambda limit: format_cpu(round_up_cpu(parse_cpu(limit) * args.cpu_request_ratio)),
+        "memory": lambda limit: format_memory(
+            round_up_memory(parse_memory(limit) * args.memory_request_ratio)
+        ),
+    }
+    missing = [name for name in limits if name in derived and name not in requests]
+    if missing:
+        for name in missing:
+            requests[name] = derived[name](limits[name])
+        resources.pop("requests", None)
+        item["resources"] = {"requests": requests, **resources}
+
+    if explicit == "Burstable" and preset_fallback:
+        requests = dict(preset.get("requests") or {})
+        limits = dict(preset.get("limits") or {})
+    # Kubernetes defaults a missing request to its limit, so the pod is only
+    # Burstable when some request ends up below its limit.
+    if explicit == "Burstable" and {"cpu", "memory"} <= limits.keys() and all(
+        name not in requests or parsers[name](requests[name]) == parsers[name](limits[name])
+        for name in ("cpu", "memory")
+    ):
+        raise ValueError(
+            f"{label}: qos_class Burstable requires a cpu or memory request below its limit"
+        )
+
+
 def normalize_workload(
     app_payload: dict[str, Any],
     workload_payload: dict[str, Any],
@@ -216,6 +726,7 @@ def normalize_workload(
     image_repository: str,
     image_tag: str,
     tls_enabled: bool,
+    resource_presets: dict[str, Any],
 ) -> dict[str, Any]:
     workload_name = pick(workload_payload, ["workload_name", "name", "id"])
     if not workload_name:
@@ -260,13 +771,38 @@ def normalize_workload(
 
     memory_limit = pick(workload_payload, ["memory_limit", "memoryLimit"])
     cpu_limit = pick(workload_payload, ["cpu_limit", "cpuLimit"])
+    memory_request = pick(workload_payload, ["memory_request", "memoryRequest"])
+    cpu_request = pick(workload_payload, ["cpu_request", "cpuRequest"])
     limits: dict[str, Any] = {}
     if memory_limit:
         limits["memory"] = str(memory_limit)
     if cpu_limit:
         limits["cpu"] = str(cpu_limit)
+    # Without explicit requests Kubernetes copies limits into requests, which
+    # reserves the full limit on the node.
+    requests: dict[str, Any] = {}
+    if memory_request:
+        requests["memory"] = str(memory_request)
+    if cpu_request:
+        requests["cpu"] = str(cpu_request)
+    resources: dict[str, Any] = {}
+    if requests:
+        resources["requests"] = requests
     if limits:
-        item["resources"] = {"limits": limits}
+        resources["limits"] = limits
+    if resources:
+        item["resources"] = resources
+    resource_preset = str(
+        pick(workload_payload, ["resource_preset", "resourcePreset"], default="") or ""
+    ).strip()
+    if resource_preset:
+        # The chart only falls back to a preset when requests/limits are empty.
+        item.setdefault("resources", {})["preset"] = resource_preset
+
+    tier = normalize_priority_tier(workload_payload, preset, workload_name)
+    if tier != DEFAULT_PRIORITY_TIER:
+        item["priorityClassName"] = f"{PRIORITY_CLASS_PREFIX}{tier}"
+    apply_qos_class(item, workload_payload, tier, resource_presets, args)
 
     workload_secrets_folder = str(
         pick(workload_payload, ["secrets_folder", "secretsFolder"], default="") or ""
@@ -287,6 +823,56 @@ def normalize_workload(
             "mountPath": "/mnt/secrets",
             "volumeAttributes": {},
         }
+        dotenv_writer = str(
+            pick(
+                workload_payload,
+                ["dotenv_writer", "dotenvWriter"],
+                default=pick(app_payload, ["dotenv_writer", "dotenvWriter"], default=""),
+            )
+            or ""
+        ).strip().lower()
+        if dotenv_writer and dotenv_writer not in DOTENV_WRITERS:
+            raise ValueError(
+                f"Workload '{workload_name}' has unsupported dotenv_writer '{dotenv_writer}'"
+            )
+        dotenv_use_app_image = pick(
+            workload_payload,
+            ["dotenv_use_app_image", "dotenvUseAppImage"],
+            default=pick(app_payload, ["dotenv_use_app_image", "dotenvUseAppImage"]),
+        )
+        dotenv: dict[str, Any] = {}
+        if dotenv_writer:
+            dotenv["writer"] = dotenv_writer
+        if dotenv_use_app_image is not None:
+            # Skips pulling alpine; the app image must provide sh (and awk).
+            dotenv["useAppImage"] = to_bool(dotenv_use_app_image)
+        if dotenv:
+            item["dotenv"] = dotenv
+
+    log_labels, log_annotations = normalize_log_controls(
+        app_payload, workload_payload, workload_name
+    )
+    if log_labels:
+        item["podLabels"] = log_labels
+    if log_annotations:
+        item["podAnnotations"] = log_annotations
+
+    runtime_files = pick(workload_payload, ["runtime_config_files", "runtimeConfigFiles"])
+    if runtime_files:
+        if workload_kind != "Deployment":
+            raise ValueError(
+                f"Workload '{workload_name}': runtime_config_files is only supported for "
+                "Deployment workloads"
+            )
+        item["runtimeConfig"] = {
+            "mode": "ui_managed_configmap",
+            "files": normalize_runtime_config_files(
+                runtime_files,
+                workload_name,
+                args.runtime_config_compress_threshold,
+                args.runtime_config_shard_bytes,
+            ),
+        }
 
     if workload_kind in {"CronJob", "Job"}:
         if workload_kind == "CronJob":
@@ -305,8 +891,14 @@ def normalize_workload(
         default=bool(fqdn) or str(preset).strip().lower() == "web",
     )
 
+    # Internal Services (no Ingress) let other workloads reach queue/API pods;
+    # exposed workloads always need one behind the Ingress.
+    service_enabled = expose or to_bool(
+        pick(workload_payload, ["service_enabled", "serviceEnabled"], default=None)
+    )
+
     ports = normalize_ports(pick(workload_payload, ["ports"], default=[]))
-    if expose and not ports:
+    if service_enabled and not ports:
         ports = [
             {
                 "name": "http",
@@ -318,11 +910,7 @@ def normalize_workload(
     if ports:
         item["ports"] = ports
 
-    item["service"] = {
-        "enabled": expose,
-        "type": "ClusterIP",
-        "annotations": {},
-    }
+    item["service"] = normalize_service(workload_payload, workload_name, service_enabled)
 
     ingress: dict[str, Any] = {"enabled": expose}
     if expose:
@@ -429,6 +1017,9 @@ def build_app_config(app_payload: dict[str, Any], args: argparse.Namespace) -> d
     workloads = pick(app_payload, ["workloads"])
     if not isinstance(workloads, list) or not workloads:
         raise ValueError("workloads must be a non-empty list")
+    if not 0 < args.cpu_request_ratio <= 1 or not 0 < args.memory_request_ratio <= 1:
+        raise ValueError("Request ratios must be within (0, 1]")
+    resource_presets = load_resource_presets(args.resource_presets_file)
 
     normalized_workloads = [
         normalize_workload(
@@ -438,10 +1029,18 @@ def build_app_config(app_payload: dict[str, Any], args: argparse.Namespace) -> d
             image_repository=image_repository,
             image_tag=image_tag,
             tls_enabled=tls_enabled,
+            resource_presets=resource_presets,
         )
         for workload in workloads
     ]
 
+    infisical = build_infisical_settings(args)
+    secret_provider_classes = (
+        build_secret_provider_classes(app_payload, workloads, normalized_workloads)
+        if infisical
+        else []
+    )
+
     return {
         "apiVersion": "infrazero.app/v1alpha1",
         "kind": "AppConfig",
@@ -453,6 +1052,7 @@ def build_app_config(app_payload: dict[str, Any], args: argparse.Namespace) -> d
                 "env": args.bootstrap_env,
                 "targetRevision": args.bootstrap_target_revision,
                 "argoNamespace": args.bootstrap_argo_namespace,
+                "rolloutGroup": args.bootstrap_rollout_group,
             },
             "global": {
                 "name": app_name,
@@ -472,7 +1072,9 @@ def build_app_config(app_payload: dict[str, Any], args: argparse.Namespace) -> d
                     "name": "",
                     "annotations": {},
                 },
-                "resourcePresets": {},
+                "resourcePresets": resource_presets,
+                "infisical": infisical,
+                "secretProviderClasses": secret_provider_classes,
                 "networkPolicy": {
                     "enabled": False,
                     "ingress": [],
@@ -484,6 +1086,18 @@ def build_app_config(app_payload: dict[str, Any], args: argparse.Namespace) -> d
     }
 
 
+def load_resource_presets(path: str | None) -> dict[str, Any]:
+    if not path:
+        return {}
+    loaded = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+    if not isinstance(loaded, dict):
+        raise ValueError("resource presets file must contain a mapping")
+    presets = loaded.get("resourcePresets", loaded)
+    if not isinstance(presets, dict):
+        raise ValueError("resourcePresets must be a mapping of preset name to requests/limits")
+    return presets
+
+
 def validate_schema(config: dict[str, Any], schema_path: str) -> None:
     if jsonschema is None:
         raise RuntimeError("jsonschema is required for --schema validation")
@@ -491,6 +1105,58 @@ def validate_schema(config: dict[str, Any], schema_path: str) -> None:
     jsonschema.validate(instance=config, schema=schema)
 
 
+def resolve_schema(schema: dict[str, Any], root: dict[str, Any], value: Any) -> dict[str, Any]:
+    ref = schema.get("$ref")
+    if isinstance(ref, str) and ref.startswith("#/"):
+        target: Any = root
+        for part in ref[2:].split("/"):
+            target = target[part]
+        return resolve_schema(target, root, value)
+    wanted = "object" if isinstance(value, dict) else "array" if isinstance(value, list) else None
+    for branch in schema.get("oneOf", []) + schema.get("anyOf", []):
+        branch = resolve_schema(branch, root, value)
+        if branch.get("type") == wanted:
+            return branch
+    return schema
+
+
+def canonical_order(value: Any, schema: dict[str, Any], root: dict[str, Any]) -> Any:
+    """Order mapping keys as declared in the schema, then free-form keys sorted.
+
+    Output then no longer depends on the order normalize_workload() happens to
+    build dicts in, so regenerating an AppConfig only diffs on real changes.
+    """
+    schema = resolve_schema(schema, root, value)
+    if isinstance(value, list):
+        items = schema.get("items")
+        return [canonical_order(item, items if isinstance(items, dict) else {}, root) for item in value]
+    if not isinstance(value, dict):
+        return value
+    properties = schema.get("properties", {})
+    extra = schema.get("additionalProperties")
+    extra = extra if isinstance(extra, dict) else {}
+    ordered = {
+        key: canonical_order(value[key], properties[key], root)
+        for key in properties
+        if key in value
+    }
+    for key in sorted(key for key in value if key not in properties):
+        ordered[key] = canonical_order(value[key], extra, root)
+    return ordered
+
+
+def write_yaml(config: dict[str, Any], stream: Any) -> None:
+    yaml.dump(config, stream, Dumper=YamlDumper, sort_keys=False)
+
+
+def write_json(config: dict[str, Any], stream: Any) -> None:
+    json.dump(config, stream, indent=2)
+    stream.write("\n")
+
+
+WRITERS = {"yaml": write_yaml, "json": write_json}
+
+
 def main() -> int:
     args = parse_args()
     payload = load_payload(args)
@@ -505,10 +1171,14 @@ def main() -> int:
     if args.schema:
         validate_schema(app_config, args.schema)
 
+    schema = json.loads(Path(args.schema or DEFAULT_SCHEMA_PATH).read_text(encoding="utf-8"))
+    app_config = canonical_order(app_config, schema, schema)
+
     output_path = Path(args.output)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    yaml_text = yaml.safe_dump(app_config, sort_keys=False)
-    output_path.write_text(yaml_text, encoding="utf-8")
+    # Stream straight to the file instead of building the whole document in memory.
+    with output_path.open("w", encoding="utf-8") as stream:
+        WRITERS[args.output_format](app_config, stream)
     return 0
 
 
@@ -0,0 +1,658 @@
+#!/usr/bin/env python3
+"""Configure Infisical Kubernetes Auth for the cluster operator identity.
+
+Runs in-cluster as the infisical-k8s-auth-bootstrap Job; each
+clusters/<env>/bootstrap/infisical-k8s-auth/configmap.yaml embeds a verbatim
+copy as bootstrap.py. Reads all kube-system inputs with one LIST call,
+computes the desired project, identity, membership and auth state, and only
+issues the writes needed to converge, so reruns are cheap no-ops.
+
+Standard library only. Environment:
+  INFRAZERO_ENV               environment name (identity k3s-<env>-operator)
+  KUBE_HOST                   kubernetesHost configured in Infisical
+  INFISICAL_ALLOWED_AUDIENCE  allowedAudience (default: infisical)
+  INFISICAL_CA_FILE           optional CA bundle for the Infisical host
+  API_RETRIES                 attempts per request (default: 5)
+  API_RETRY_DELAY             base backoff in seconds (default: 2)
+  API_RETRY_MAX_DELAY         backoff cap in seconds (default: 30)
+  KUBE_API_URL                API server URL (default: in-cluster service)
+  SERVICE_ACCOUNT_DIR         token/ca.crt directory (default: in-cluster mount)
+"""
+
+from __future__ import annotations
+
+import base64
+import email.utils
+import http.client
+import json
+import os
+import random
+import re
+import ssl
+import sys
+import time
+from typing import Any
+from urllib.parse import quote, urlencode, urlsplit
+
+
+KUBE_SYSTEM_NS = "kube-system"
+ADMIN_SECRET = "infisical-admin-token"
+ORG_SECRET = "infisical-organization"
+PROJECT_SECRET = "infisical-project-name"
+RESULT_SECRET = "infisical-bootstrap-result"
+REVIEWER_SA = "infisical-token-reviewer"
+REVIEWER_SECRET = "infisical-token-reviewer-token"
+REVIEWER_BINDING = "infisical-token-reviewer-auth-delegator"
+EXCLUDED_NAMESPACES = {"kube-system", "argocd", "kube-public", "kube-node-lease"}
+DEFAULT_SERVICE_ACCOUNT_DIR = "/var/run/secrets/kubernetes.io/serviceaccount"
+DEFAULT_KUBE_HOST = "https://kubernetes.default.svc"
+ORG_ID_RE = re.compile(r"^[0-9a-fA-F-]{36}$")
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+LIST_PAGE_SIZE = 500
+TOKEN_POLL_ATTEMPTS = 30
+TOKEN_POLL_DELAY = 2.0
+LIST_FIELDS = ("allowedNamespaces", "allowedNames")
+
+
+class BootstrapError(Exception):
+    pass
+
+
+def log(message: str) -> None:
+    print(f"[infisical-k8s-auth] {message}", file=sys.stderr, flush=True)
+
+
+def decode_body(raw: bytes) -> Any:
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw.decode("utf-8", errors="replace")
+
+
+def is_success(status: int) -> bool:
+    return 200 <= status < 300
+
+
+def require_success(status: int, body: Any, context: str) -> Any:
+    if not is_success(status):
+        raise BootstrapError(f"{context} failed (status {status}): {json.dumps(body)}")
+    return body
+
+
+class HttpSession:
+    """JSON client that keeps one connection to a host open across requests.
+
+    Connection errors, 429 and 5xx responses are retried with exponential
+    backoff and jitter; a Retry-After header takes precedence when present.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict[str, str] | None = None,
+        ca_file: str | None = None,
+        retries: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 30.0,
+        timeout: float = 30.0,
+    ) -> None:
+        parts = urlsplit(base_url.rstrip("/"))
+        if parts.scheme not in {"http", "https"} or not parts.hostname:
+            raise BootstrapError(f"Invalid URL: {base_url!r}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path
+        self.headers = {"Accept": "application/json", **(headers or {})}
+        self.context = ssl.create_default_context(cafile=ca_file) if self.scheme == "https" else None
+        self.retries = max(1, retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._conn: http.client.HTTPConnection | None = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            if self.scheme == "https":
+                self._conn = http.client.HTTPSConnection(
+                    self.host, self.port, timeout=self.timeout, context=self.context
+                )
+            else:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def backoff(self, attempt: int) -> float:
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(cap / 2, cap)
+
+    def retry_after(self, value: str | None) -> float | None:
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(self.max_delay, max(0.0, seconds))
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Any = None,
+        content_type: str = "application/json",
+    ) -> tuple[int, Any]:
+        payload = None if body is None else json.dumps(body).encode("utf-8")
+        headers = dict(self.headers)
+        if payload is not None:
+            headers["Content-Type"] = content_type
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                conn = self._connection()
+                conn.request(method, self.prefix + path, body=payload, headers=headers)
+                response = conn.getresponse()
+                raw = response.read()
+                if response.will_close:
+                    self.close()
+            except ssl.SSLCertVerificationError as exc:
+                self.close()
+                raise BootstrapError(f"{method} {path} failed: {exc}") from exc
+            except (http.client.HTTPException, OSError) as exc:
+                # Also covers keep-alive connections the server closed while idle.
+                self.close()
+                if attempt >= self.retries:
+                    raise BootstrapError(f"{method} {path} failed: {exc}") from exc
+                delay = self.backoff(attempt)
+                log(f"{method} {path} failed ({exc}). Retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                continue
+
+            if response.status in RETRYABLE_STATUSES and attempt < self.retries:
+                delay = self.retry_after(response.getheader("Retry-After"))
+                if delay is None:
+                    delay = self.backoff(attempt)
+                log(f"{method} {path} returned {response.status}. Retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                continue
+            return response.status, decode_body(raw)
+
+
+class KubeClient:
+    def __init__(self, session: HttpSession) -> None:
+        self.session = session
+        self.writes = 0
+
+    def list(self, path: str) -> list[dict[str, Any]]:
+        items: list[dict[str, Any]] = []
+        token = None
+        while True:
+            query: dict[str, Any] = {"limit": LIST_PAGE_SIZE}
+            if token:
+                query["continue"] = token
+            status, body = self.session.request("GET", f"{path}?{urlencode(query)}")
+            require_success(status, body, f"List {path}")
+            items.extend(body.get("items") or [])
+            token = (body.get("metadata") or {}).get("continue")
+            if not token:
+                return items
+
+    def get(self, path: str) -> dict[str, Any] | None:
+        status, body = self.session.request("GET", path)
+        if status == 404:
+            return None
+        return require_success(status, body, f"Get {path}")
+
+    def create(self, path: str, obj: dict[str, Any]) -> dict[str, Any]:
+        self.writes += 1
+        status, body = self.session.request("POST", path, obj)
+        return require_success(status, body, f"Create {path}")
+
+    def patch(self, path: str, patch: dict[str, Any]) -> dict[str, Any]:
+        self.writes += 1
+        status, body = self.session.request(
+            "PATCH", path, patch, content_type="application/merge-patch+json"
+        )
+        return require_success(status, body, f"Patch {path}")
+
+
+class InfisicalClient:
+    def __init__(self, session: HttpSession) -> None:
+        self.session = session
+        self.writes = 0
+
+    def get(self, path: str) -> tuple[int, Any]:
+        return self.session.request("GET", path)
+
+    def write(self, method: str, path: str, body: Any, context: str) -> Any:
+        self.writes += 1
+        status, response = self.session.request(method, path, body)
+        return require_success(status, response, context)
+
+
+def secret_data(secret: dict[str, Any] | None) -> dict[str, str]:
+    if not secret:
+        return {}
+    decoded = {}
+    for key, value in (secret.get("data") or {}).items():
+        decoded[key] = base64.b64decode(value or "").decode("utf-8")
+    return decoded
+
+
+def secret_value(
+    secrets: dict[str, dict[str, Any]], name: str, prefer: tuple[str, ...], any_key: bool
+) -> str:
+    if name not in secrets:
+        raise BootstrapError(f"Secret {KUBE_SYSTEM_NS}/{name} not found")
+    data = secret_data(secrets[name])
+    for key in prefer:
+        if data.get(key):
+            return data[key]
+    if any_key and data:
+        return data[sorted(data)[0]]
+    if not data:
+        raise BootstrapError(f"Secret {name} has no data keys")
+    raise BootstrapError(f"Secret {name} missing key {prefer[0]}")
+
+
+def compute_allowlists(
+    namespaces: list[dict[str, Any]], service_accounts: list[dict[str, Any]]
+) -> tuple[str, str]:
+    allowed = sorted(
+        {
+            item["metadata"]["name"]
+            for item in namespaces
+            if item["metadata"]["name"] not in EXCLUDED_NAMESPACES
+        }
+    )
+    allowed_set = set(allowed)
+    names = sorted(
+        {
+            item["metadata"]["name"]
+            for item in service_accounts
+            if item["metadata"].get("namespace") in allowed_set
+        }
+    )
+    return ",".join(allowed), ",".join(names)
+
+
+def ensure_reviewer_token(
+    kube: KubeClient, secrets: dict[str, dict[str, Any]]
+) -> tuple[str, bool]:
+    """Return the token reviewer JWT and whether its Secret was created now."""
+    path = f"/api/v1/namespaces/{KUBE_SYSTEM_NS}/secrets"
+    existing = secrets.get(REVIEWER_SECRET)
+    token = secret_data(existing).get("token")
+    if token:
+        return token, False
+
+    created = existing is None
+    if created:
+        kube.create(
+            path,
+            {
+                "apiVersion": "v1",
+                "kind": "Secret",
+                "metadata": {
+                    "name": REVIEWER_SECRET,
+                    "namespace": KUBE_SYSTEM_NS,
+                    "annotations": {"kubernetes.io/service-account.name": REVIEWER_SA},
+                },
+                "type": "kubernetes.io/service-account-token",
+            },
+        )
+    for attempt in range(TOKEN_POLL_ATTEMPTS):
+        token = secret_data(kube.get(f"{path}/{REVIEWER_SECRET}")).get("token")
+        if token:
+            return token, created
+        if attempt + 1 < TOKEN_POLL_ATTEMPTS:
+            time.sleep(TOKEN_POLL_DELAY)
+    raise BootstrapError("Token reviewer secret not populated")
+
+
+def ensure_result_secret(
+    kube: KubeClient, existing: dict[str, Any] | None, desired: dict[str, str]
+) -> None:
+    path = f"/api/v1/namespaces/{KUBE_SYSTEM_NS}/secrets"
+    if existing is None:
+        kube.create(
+            path,
+            {
+                "apiVersion": "v1",
+                "kind": "Secret",
+                "metadata": {"name": RESULT_SECRET, "namespace": KUBE_SYSTEM_NS},
+                "type": "Opaque",
+                "stringData": desired,
+            },
+        )
+        log(f"Created result secret {RESULT_SECRET}")
+        return
+    current = secret_data(existing)
+    if all(current.get(key) == value for key, value in desired.items()):
+        log(f"Result secret {RESULT_SECRET} unchanged")
+        return
+    kube.patch(f"{path}/{RESULT_SECRET}", {"stringData": desired})
+    log(f"Updated result secret {RESULT_SECRET}")
+
+
+def ensure_project(
+    api: InfisicalClient, project_name: str, org_filter: str
+) -> tuple[str, str]:
+    log("Ensuring project exists")
+    status, body = api.get("/api/v1/projects")
+    require_success(status, body, "List projects")
+    matches = [
+        project
+        for project in body.get("projects") or []
+        if project.get("name") == project_name
+        and (not org_filter or project.get("orgId") == org_filter)
+    ]
+    if len(matches) > 1:
+        raise BootstrapError(
+            f"Multiple projects named {project_name} found. "
+            "Set infisical-organization to the organization ID."
+        )
+    if matches:
+        project = matches[0]
+    else:
+        body = api.write(
+            "POST",
+            "/api/v1/projects",
+            {
+                "projectName": project_name,
+                "type": "secret-manager",
+                "template": "default",
+                "shouldCreateDefaultEnvs": True,
+            },
+            "Create project",
+        )
+        project = body.get("project") or {}
+        log(f"Created project {project_name}")
+
+    project_id = project.get("id")
+    org_id = project.get("orgId")
+    if not project_id:
+        raise BootstrapError("Project ID not found")
+    if not org_id:
+        raise BootstrapError("Organization ID not found")
+    if org_filter and org_id != org_filter:
+        raise BootstrapError(
+            f"Project orgId {org_id} does not match requested org ID {org_filter}"
+        )
+    if not org_filter:
+        log(f"Using orgId {org_id} derived from project lookup/creation.")
+    log(f"Project ID: {project_id}")
+    return project_id, org_id
+
+
+def ensure_identity(api: InfisicalClient, identity_name: str, org_id: str) -> str:
+    log("Ensuring identity exists")
+    status, body = api.get(f"/api/v1/identities?{urlencode({'orgId': org_id})}")
+    require_success(status, body, "List identities")
+    for item in body.get("identities") or []:
+        if (item.get("identity") or {}).get("name") == identity_name and item.get("identityId"):
+            identity_id = item["identityId"]
+            break
+    else:
+        body = api.write(
+            "POST",
+            "/api/v1/identities",
+            {
+                "name": identity_name,
+                "organizationId": org_id,
+                "role": "admin",
+                "hasDeleteProtection": False,
+            },
+            "Create identity",
+        )
+        identity_id = (body.get("identity") or {}).get("id")
+        log(f"Created identity {identity_name}")
+    if not identity_id:
+        raise BootstrapError("Identity ID not found")
+    log(f"Identity ID: {identity_id}")
+    return identity_id
+
+
+def ensure_membership(api: InfisicalClient, project_id: str, identity_id: str) -> None:
+    log("Ensuring identity is a project member")
+    path = f"/api/v1/projects/{quote(project_id)}/memberships/identities/{quote(identity_id)}"
+    status, body = api.get(path)
+    if status == 404:
+        api.write("POST", path, {"role": "admin"}, "Create identity membership")
+        log("Added identity to project as admin")
+        return
+    require_success(status, body, "Get identity membership")
+    roles = ((body or {}).get("identityMembership") or {}).get("roles") or []
+    if any(role.get("role") == "admin" for role in roles):
+        log("Identity membership unchanged")
+        return
+    api.write(
+        "PATCH",
+        path,
+        {"roles": [{"role": "admin", "isTemporary": False}]},
+        "Update identity membership",
+    )
+    log("Updated identity membership to admin")
+
+
+def auth_config_changes(current: dict[str, Any], desired: dict[str, str]) -> list[str]:
+    changed = []
+    for key, value in desired.items():
+        if key not in current:
+            # Infisical may omit secrets such as tokenReviewerJwt from reads.
+            if key == "tokenReviewerJwt":
+                continue
+            changed.append(key)
+            continue
+        have = current.get(key)
+        if key in LIST_FIELDS:
+            have_items = {part.strip() for part in str(have or "").split(",") if part.strip()}
+            want_items = {part for part in value.split(",") if part}
+            if have_items != want_items:
+                changed.append(key)
+        elif str(have or "").strip() != value.strip():
+            changed.append(key)
+    return changed
+
+
+def ensure_kubernetes_auth(
+    api: InfisicalClient, identity_id: str, desired: dict[str, str], force: bool
+) -> None:
+    log("Configuring Kubernetes auth")
+    path = f"/api/v1/auth/kubernetes-auth/identities/{quote(identity_id)}"
+    status, body = api.get(path)
+    if status == 404:
+        api.write("POST", path, desired, "Attach Kubernetes auth")
+        log("Attached Kubernetes auth")
+        return
+    require_success(status, body, "Retrieve Kubernetes auth")
+    current = (body or {}).get("identityKubernetesAuth") or {}
+    changed = auth_config_changes(current, desired)
+    if force and "tokenReviewerJwt" not in changed:
+        changed.append("tokenReviewerJwt")
+    if not changed:
+        log("Kubernetes auth unchanged")
+        return
+    api.write("PATCH", path, desired, "Update Kubernetes auth")
+    log(f"Updated Kubernetes auth ({', '.join(sorted(changed))})")
+
+
+def env_number(name: str, default: float) -> float:
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError as exc:
+        raise BootstrapError(f"{name} must be a number, got {value!r}") from exc
+
+
+def kube_api_url() -> str:
+    explicit = os.environ.get("KUBE_API_URL", "").strip()
+    if explicit:
+        return explicit
+    host = os.environ.get("KUBERNETES_SERVICE_HOST", "").strip()
+    port = os.environ.get("KUBERNETES_SERVICE_PORT", "443").strip()
+    if not host:
+        raise BootstrapError("KUBERNETES_SERVICE_HOST is not set; run in-cluster or set KUBE_API_URL")
+    if ":" in host:
+        host = f"[{host}]"
+    return f"https://{host}:{port}"
+
+
+def read_file(path: str, label: str) -> str:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return handle.read()
+    except OSError as exc:
+        raise BootstrapError(f"Missing {label} at {path}") from exc
+
+
+def run() -> None:
+    env_name = os.environ.get("INFRAZERO_ENV", "").strip()
+    if not env_name:
+        raise BootstrapError("INFRAZERO_ENV is required")
+    allowed_audience = os.environ.get("INFISICAL_ALLOWED_AUDIENCE", "infisical").strip()
+    if not allowed_audience:
+        raise BootstrapError("Allowed audience is empty")
+    kube_host = os.environ.get("KUBE_HOST", "").strip() or DEFAULT_KUBE_HOST
+    retries = int(env_number("API_RETRIES", 5))
+    base_delay = env_number("API_RETRY_DELAY", 2)
+    max_delay = env_number("API_RETRY_MAX_DELAY", 30)
+
+    sa_dir = os.environ.get("SERVICE_ACCOUNT_DIR", "").strip() or DEFAULT_SERVICE_ACCOUNT_DIR
+    ca_path = os.path.join(sa_dir, "ca.crt")
+    ca_cert = read_file(ca_path, "CA cert")
+    sa_token = read_file(os.path.join(sa_dir, "token"), "service account token").strip()
+
+    kube = KubeClient(
+        HttpSession(
+            kube_api_url(),
+            headers={"Authorization": f"Bearer {sa_token}"},
+            ca_file=ca_path,
+            retries=retries,
+            base_delay=base_delay,
+            max_delay=max_delay,
+        )
+    )
+
+    # One LIST covers the admin token, org/project inputs, the token reviewer
+    # secret and the previous result secret.
+    secrets = {
+        item["metadata"]["name"]: item
+        for item in kube.list(f"/api/v1/namespaces/{KUBE_SYSTEM_NS}/secrets")
+    }
+    infisical_host = secret_value(secrets, ADMIN_SECRET, ("host",), any_key=False).rstrip("/")
+    infisical_token = secret_value(secrets, ADMIN_SECRET, ("token",), any_key=False)
+    org_input = secret_value(
+        secrets, ORG_SECRET, ("value", "infisical_organization"), any_key=True
+    ).strip()
+    project_name = secret_value(
+        secrets, PROJECT_SECRET, ("value", "infisical_project_name"), any_key=True
+    ).strip()
+    if not org_input:
+        raise BootstrapError("Organization name or ID is empty")
+    if not project_name:
+        raise BootstrapError("Project name is empty")
+    org_filter = org_input if ORG_ID_RE.match(org_input) else ""
+    identity_name = f"k3s-{env_name}-operator"
+
+    service_accounts = kube.list("/api/v1/serviceaccounts")
+    allowed_namespaces, allowed_names = compute_allowlists(
+        kube.list("/api/v1/namespaces"), service_accounts
+    )
+    log(f"Allowed namespaces: {allowed_namespaces}")
+    log(f"Allowed service accounts: {allowed_names}")
+    log(f"Allowed audience: {allowed_audience}")
+    log(f"Kubernetes host: {kube_host}")
+
+    if not any(
+        item["metadata"]["name"] == REVIEWER_SA
+        and item["metadata"].get("namespace") == KUBE_SYSTEM_NS
+        for item in service_accounts
+    ):
+        raise BootstrapError(
+            f"Missing service account {KUBE_SYSTEM_NS}/{REVIEWER_SA}. "
+            "Apply the bootstrap kustomization with cluster-admin privileges."
+        )
+    if kube.get(f"/apis/rbac.authorization.k8s.io/v1/clusterrolebindings/{REVIEWER_BINDING}") is None:
+        raise BootstrapError(
+            f"Missing ClusterRoleBinding {REVIEWER_BINDING}. "
+            "Apply the bootstrap kustomization with cluster-admin privileges."
+        )
+    reviewer_jwt, reviewer_created = ensure_reviewer_token(kube, secrets)
+
+    api = InfisicalClient(
+        HttpSession(
+            infisical_host,
+            headers={"Authorization": f"Bearer {infisical_token}"},
+            ca_file=os.environ.get("INFISICAL_CA_FILE", "").strip() or None,
+            retries=retries,
+            base_delay=base_delay,
+            max_delay=max_delay,
+        )
+    )
+    try:
+        project_id, org_id = ensure_project(api, project_name, org_filter)
+        identity_id = ensure_identity(api, identity_name, org_id)
+        ensure_membership(api, project_id, identity_id)
+
+        ensure_result_secret(
+            kube,
+            secrets.get(RESULT_SECRET),
+            {
+                "identityId": identity_id,
+                "projectId": project_id,
+                "projectName": project_name,
+                "orgId": org_id,
+                "orgInput": org_input,
+                "identityName": identity_name,
+                "envName": env_name,
+            },
+        )
+
+        ensure_kubernetes_auth(
+            api,
+            identity_id,
+            {
+                "kubernetesHost": kube_host,
+                "caCert": ca_cert,
+                "tokenReviewerJwt": reviewer_jwt,
+                "tokenReviewMode": "api",
+                "allowedNamespaces": allowed_namespaces,
+                "allowedNames": allowed_names,
+                "allowedAudience": allowed_audience,
+            },
+            force=reviewer_created,
+        )
+    finally:
+        api.session.close()
+        kube.session.close()
+
+    log(
+        "Infisical Kubernetes auth bootstrap complete "
+        f"({api.writes} Infisical and {kube.writes} Kubernetes writes)"
+    )
+
+
+def main() -> int:
+    try:
+        run()
+    except BootstrapError as exc:
+        log(f"ERROR: {exc}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,89 @@
+"""Parse and format Kubernetes resource quantities (cpu/memory).
+
+CPU values are handled as integer millicores and memory values as integer
+bytes so that sums across many workloads stay exact.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+BINARY_SUFFIXES = {
+    "Ki": Decimal(1024),
+    "Mi": Decimal(1024**2),
+    "Gi": Decimal(1024**3),
+    "Ti": Decimal(1024**4),
+    "Pi": Decimal(1024**5),
+    "Ei": Decimal(1024**6),
+}
+DECIMAL_SUFFIXES = {
+    "n": Decimal("1e-9"),
+    "u": Decimal("1e-6"),
+    "m": Decimal("1e-3"),
+    "": Decimal(1),
+    "k": Decimal("1e3"),
+    "M": Decimal("1e6"),
+    "G": Decimal("1e9"),
+    "T": Decimal("1e12"),
+    "P": Decimal("1e15"),
+    "E": Decimal("1e18"),
+}
+
+QUANTITY_RE = re.compile(
+    r"^(?P<number>[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)(?P<suffix>[KMGTPE]i|[numkMGTPE]?)$"
+)
+
+
+def parse_quantity(value: Any) -> Decimal:
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid quantity: {value!r}")
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+    text = str(value or "").strip()
+    match = QUANTITY_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid quantity: {value!r}")
+    try:
+        number = Decimal(match.group("number"))
+    except InvalidOperation as exc:  # pragma: no cover - guarded by regex
+        raise ValueError(f"Invalid quantity: {value!r}") from exc
+    suffix = match.group("suffix")
+    multiplier = BINARY_SUFFIXES.get(suffix) or DECIMAL_SUFFIXES[suffix]
+    return number * multiplier
+
+
+def parse_cpu(value: Any) -> int:
+    """Return CPU as millicores, rounding up like the API server does."""
+    return int(math.ceil(parse_quantity(value) * 1000))
+
+
+def parse_memory(value: Any) -> int:
+    """Return memory as bytes, rounding up to a whole byte."""
+    return int(math.ceil(parse_quantity(value)))
+
+
+def format_cpu(millicores: int | float) -> str:
+    millicores = int(math.ceil(millicores))
+    if millicores % 1000 == 0:
+        return str(millicores // 1000)
+    return f"{millicores}m"
+
+
+def format_memory(num_bytes: int | float) -> str:
+    num_bytes = int(math.ceil(num_bytes))
+    for suffix in ("Gi", "Mi", "Ki"):
+        unit = int(BINARY_SUFFIXES[suffix])
+        if num_bytes and num_bytes % unit == 0:
+            return f"{num_bytes // unit}{suffix}"
+    return str(num_bytes)
+
+
+def round_up_cpu(millicores: float, step: int = 10) -> int:
+    return int(math.ceil(millicores / step) * step)
+
+
+def round_up_memory(num_bytes: float, step: int = 1024**2) -> int:
+    return int(math.ceil(num_bytes / step) * step)
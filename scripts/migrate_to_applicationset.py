@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+"""Replace per-app Argo CD Applications with the env ApplicationSet.
+
+Older overlays list one `clusters/<env>/applications/apps/<app>.yaml`
+Application per app. The ApplicationSet in
+`clusters/<env>/applications/apps/applicationset.yaml` generates Applications
+with the same names, and the ApplicationSet controller adopts an existing
+Application of the same name instead of recreating it, so workloads keep
+running as long as the root app never deletes the old Application:
+
+1. `prepare`: annotate each per-app Application with
+   `argocd.argoproj.io/sync-options: Prune=false` and drop the cascading
+   resources finalizer, editing only those metadata lines so comments and key
+   order survive. Commit and wait for the root app to sync.
+2. `finalize`: check that every Application will be adopted unchanged
+   (same name, values file and destination), copy its repoURL and
+   targetRevision into the ApplicationSet, then swap the kustomization
+   entries and delete the per-app manifests. The ApplicationSet and
+   kustomization are re-serialized, which drops their comments. Commit; the root app leaves the
+   old Applications in place and the ApplicationSet takes them over.
+3. The root app still tracks the adopted Applications and, since they carry
+   Prune=false, stays OutOfSync. Once it has synced, run the `kubectl`
+   commands finalize prints to drop its tracking label/annotation and the
+   Prune=false annotation from each adopted Application.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+APPS_DIR = "applications/apps"
+APPLICATIONSET_FILE = "applicationset.yaml"
+SYNC_OPTIONS_ANNOTATION = "argocd.argoproj.io/sync-options"
+NO_PRUNE = "Prune=false"
+RESOURCES_FINALIZER = "resources-finalizer.argocd.argoproj.io"
+# Default Argo CD resource tracking (label) and annotation-based tracking.
+ROOT_TRACKING_LABEL = "app.kubernetes.io/instance"
+ROOT_TRACKING_ANNOTATION = "argocd.argoproj.io/tracking-id"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Migrate per-app Applications to the ApplicationSet.")
+    parser.add_argument("phase", choices=["prepare", "finalize"])
+    parser.add_argument("--env", required=True, help="Environment overlay under clusters/ (dev/test/prod).")
+    parser.add_argument("--repo-root", default=str(REPO_ROOT), help="GitOps repository root.")
+    return parser.parse_args()
+
+
+def load_yaml(path: Path) -> Any:
+    return yaml.safe_load(path.read_text(encoding="utf-8-sig"))
+
+
+def write_yaml(path: Path, data: Any) -> None:
+    path.write_text(yaml.safe_dump(data, sort_keys=False, width=1000), encoding="utf-8")
+
+
+def edit_metadata_lines(text: str, annotation: str, finalizers: list[str]) -> str:
+    """Set the sync-options annotation and finalizers in a block-style manifest.
+
+    Only top-level `metadata.annotations.<sync-options>` and
+    `metadata.finalizers` lines change; everything else is kept verbatim.
+    """
+    newline = "\r\n" if "\r\n" in text else "\n"
+    lines = text.splitlines()
+    start = next(index for index, line in enumerate(lines) if line.rstrip() == "metadata:")
+    end = start + 1
+    while end < len(lines) and (not lines[end].strip() or lines[end][:1] in (" ", "#")):
+        end += 1
+    block = lines[start + 1 : end]
+    indent = next(
+        (line[: len(line) - len(line.lstrip())] for line in block if line.strip()), "  "
+    )
+
+    def find_key(key: str) -> int | None:
+        for index, line in enumerate(block):
+            if line.startswith(f"{indent}{key}:"):
+                return index
+        return None
+
+    def children(index: int) -> int:
+        # Block sequences may sit at the key's own indent ("- item").
+        end_index = index + 1
+        while end_index < len(block) and (
+            not block[end_index].strip()
+            or len(block[end_index]) - len(block[end_index].lstrip()) > len(indent)
+            or block[end_index].startswith(f"{indent}- ")
+        ):
+            end_index += 1
+        return end_index
+
+    index = find_key("finalizers")
+    if index is not None:
+        replacement = [f"{indent}finalizers:"] + [f"{indent}- {item}" for item in finalizers]
+        block[index : children(index)] = replacement if finalizers else []
+
+    entry = f"{SYNC_OPTIONS_ANNOTATION}: {annotation}"
+    index = find_key("annotations")
+    if index is None:
+        block.extend([f"{indent}annotations:", f"{indent * 2}{entry}"])
+    elif block[index].rstrip() != f"{indent}annotations:":
+        raise ValueError("flow-style metadata.annotations")
+    else:
+        end_index = children(index)
+        for child in range(index + 1, end_index):
+            if block[child].lstrip().startswith(f"{SYNC_OPTIONS_ANNOTATION}:"):
+                child_indent = block[child][: len(block[child]) - len(block[child].lstrip())]
+                block[child] = f"{child_indent}{entry}"
+                break
+        else:
+            child_indent = next(
+                (
+                    line[: len(line) - len(line.lstrip())]
+                    for line in block[index + 1 : end_index]
+                    if line.strip()
+                ),
+                indent * 2,
+            )
+            block.insert(index + 1, f"{child_indent}{entry}")
+    lines[start + 1 : end] = block
+    return newline.join(lines) + newline
+
+
+def per_app_applications(env_dir: Path, kustomization: dict[str, Any]) -> list[tuple[str, Path]]:
+    entries = []
+    for entry in kustomization.get("resources") or []:
+        entry = str(entry)
+        if entry.startswith(f"{APPS_DIR}/") and not entry.endswith(f"/{APPLICATIONSET_FILE}"):
+            path = env_dir / entry
+            if load_yaml(path).get("kind") == "Application":
+                entries.append((entry, path))
+    return entries
+
+
+def sync_options(application: dict[str, Any]) -> list[str]:
+    annotations = application.get("metadata", {}).get("annotations") or {}
+    raw = str(annotations.get(SYNC_OPTIONS_ANNOTATION) or "")
+    return [item.strip() for item in raw.split(",") if item.strip()]
+
+
+def prepare(entries: list[tuple[str, Path]]) -> int:
+    for _, path in entries:
+        raw = path.read_bytes()
+        bom = raw.startswith(b"\xef\xbb\xbf")
+        text = raw.decode("utf-8-sig")
+        application = yaml.safe_load(text)
+        metadata = application.setdefault("metadata", {})
+        options = sync_options(application)
+        if NO_PRUNE not in options:
+            options.append(NO_PRUNE)
+        annotation = ",".join(options)
+        metadata.setdefault("annotations", {})[SYNC_OPTIONS_ANNOTATION] = annotation
+        finalizers = [item for item in metadata.get("finalizers") or [] if item != RESOURCES_FINALIZER]
+        if finalizers:
+            metadata["finalizers"] = finalizers
+        else:
+            metadata.pop("finalizers", None)
+
+        try:
+            edited = edit_metadata_lines(text, annotation, finalizers)
+            if yaml.safe_load(edited) != application:
+                raise ValueError("line edit does not match")
+        except (StopIteration, ValueError, yaml.YAMLError):
+            write_yaml(path, application)
+            print(f"Prepared {path} (rewritten; comments and key order were not kept)")
+            continue
+        path.write_bytes((b"\xef\xbb\xbf" if bom else b"") + edited.encode("utf-8"))
+        print(f"Prepared {path}")
+    print("Commit, wait for the root app to sync, then run finalize.")
+    return 0
+
+
+def load_app_configs(repo_root: Path) -> dict[str, tuple[str, dict[str, Any]]]:
+    configs = {}
+    for path in sorted((repo_root / "config" / "apps").glob("*.yaml")):
+        config = load_yaml(path) or {}
+        name = str((config.get("metadata") or {}).get("name") or "")
+        configs[name] = (path.relative_to(repo_root).as_posix(), config)
+    return configs
+
+
+def adoption_problems(
+    application: dict[str, Any],
+    configs: dict[str, tuple[str, dict[str, Any]]],
+    project: str,
+) -> list[str]:
+    name = application["metadata"]["name"]
+    if NO_PRUNE not in sync_options(application):
+        return [f"{name}: missing {SYNC_OPTIONS_ANNOTATION}: {NO_PRUNE}; run prepare first"]
+    if RESOURCES_FINALIZER in (application["metadata"].get("finalizers") or []):
+        return [f"{name}: still has {RESOURCES_FINALIZER}; run prepare first"]
+    if name not in configs:
+        return [f"{name}: no config/apps/*.yaml with metadata.name {name}"]
+
+    config_path, config = configs[name]
+    spec = application.get("spec") or {}
+    source = spec.get("source") or {}
+    value_files = (source.get("helm") or {}).get("valueFiles") or []
+    namespace = ((config.get("spec") or {}).get("global") or {}).get("namespace")
+    problems = []
+    if spec.get("project") != project:
+        problems.append(f"{name}: project {spec.get('project')} != {project}")
+    if source.get("path") != "charts/app" or value_files != [f"../../{config_path}"]:
+        problems.append(f"{name}: source is not charts/app with values ../../{config_path}")
+    if (spec.get("destination") or {}).get("namespace") != namespace:
+        problems.append(
+            f"{name}: destination namespace {(spec.get('destination') or {}).get('namespace')} "
+            f"!= spec.global.namespace {namespace}"
+        )
+    return problems
+
+
+def finalize(
+    repo_root: Path,
+    env_dir: Path,
+    kustomization: dict[str, Any],
+    entries: list[tuple[str, Path]],
+) -> int:
+    appset_entry = f"{APPS_DIR}/{APPLICATIONSET_FILE}"
+    appset_path = env_dir / appset_entry
+    if not appset_path.is_file():
+        raise ValueError(f"{appset_path} not found; update the overlay from the public base first")
+    appset = load_yaml(appset_path)
+    template_spec = appset["spec"]["template"]["spec"]
+
+    applications = [load_yaml(path) for _, path in entries]
+    configs = load_app_configs(repo_root)
+    problems = [
+        problem
+        for application in applications
+        for problem in adoption_problems(application, configs, template_spec["project"])
+    ]
+    sources = {
+        (app["spec"]["source"]["repoURL"], app["spec"]["source"].get("targetRevision", "HEAD"))
+        for app in applications
+    }
+    if len(sources) > 1:
+        problems.append(f"Applications disagree on repoURL/targetRevision: {sorted(sources)}")
+    if problems:
+        raise ValueError("Cannot hand over to the ApplicationSet:\n  " + "\n  ".join(problems))
+
+    if sources:
+        repo_url, revision = sources.pop()
+        template_spec["source"]["repoURL"] = repo_url
+        template_spec["source"]["targetRevision"] = revision
+        for generator in appset["spec"]["generators"]:
+            generator["git"]["repoURL"] = repo_url
+            generator["git"]["revision"] = revision
+        write_yaml(appset_path, appset)
+
+    removed = {entry for entry, _ in entries}
+    resources = [entry for entry in kustomization.get("resources") or [] if entry not in removed]
+    if appset_entry not in resources:
+        resources.append(appset_entry)
+    kustomization["resources"] = resources
+    write_yaml(env_dir / "kustomization.yaml", kustomization)
+    for _, path in entries:
+        path.unlink()
+
+    adopted = {app["metadata"]["name"] for app in applications}
+    for name in sorted(set(configs) - adopted):
+        print(f"{name}: no existing Application; the ApplicationSet will create it")
+    print(f"Handed {len(adopted)} Application(s) over to {appset_path}")
+    if adopted:
+        print("Commit, wait for the root app to sync, then untrack the adopted Applications:")
+        for app in applications:
+            name = app["metadata"]["name"]
+            namespace = app["metadata"].get("namespace") or "argocd"
+            print(f"  kubectl -n {namespace} label application {name} {ROOT_TRACKING_LABEL}-")
+            print(
+                f"  kubectl -n {namespace} annotate application {name} "
+                f"{ROOT_TRACKING_ANNOTATION}- {SYNC_OPTIONS_ANNOTATION}-"
+            )
+    return 0
+
+
+def main() -> int:
+    args = parse_args()
+    repo_root = Path(args.repo_root)
+    env_dir = repo_root / "clusters" / args.env
+    kustomization = load_yaml(env_dir / "kustomization.yaml")
+    entries = per_app_applications(env_dir, kustomization)
+    if args.phase == "prepare":
+        return prepare(entries)
+    return finalize(repo_root, env_dir, kustomization, entries)
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # pragma: no cover
+        print(f"ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
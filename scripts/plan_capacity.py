@@ -0,0 +1,492 @@
+#!/usr/bin/env python
+"""Plan cluster capacity for one or more AppConfig files.
+
+Sums the effective requests and limits of every workload (times its peak
+replica count) and compares them with a local node inventory:
+
+nodePools:
+- name: workers
+  count: 3
+  allocatable:
+    cpu: "4"
+    memory: 8Gi
+  systemReserved:
+    cpu: 500m
+    memory: 1Gi
+  labels:
+    node-role.kubernetes.io/worker: "true"
+
+Optionally emits a namespace ResourceQuota/LimitRange and a resourcePresets
+catalog whose requests are a fraction of limits so pods pack more densely.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from generate_app_config import DEFAULT_CPU_REQUEST_RATIO, DEFAULT_MEMORY_REQUEST_RATIO
+from k8s_quantity import (
+    format_cpu,
+    format_memory,
+    parse_cpu,
+    parse_memory,
+    round_up_cpu,
+    round_up_memory,
+)
+
+DEFAULT_CRON_OVERLAP = 2
+DEFAULT_TOP = 10
+DEFAULT_QUOTA_HEADROOM = 0.2
+DEFAULT_LIMIT_RANGE_PRESET = "small"
+
+# Limits for the emitted preset catalog; requests are derived via ratios.
+PRESET_LIMITS = [
+    ("nano", "100m", "128Mi"),
+    ("micro", "250m", "256Mi"),
+    ("small", "500m", "512Mi"),
+    ("medium", "1", "1Gi"),
+    ("large", "2", "2Gi"),
+    ("xlarge", "4", "4Gi"),
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Plan cluster capacity from AppConfig files.")
+    parser.add_argument(
+        "--config",
+        action="append",
+        required=True,
+        help="AppConfig YAML file or directory of them; repeatable.",
+    )
+    parser.add_argument("--nodes", required=True, help="Path to the node inventory YAML.")
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Workloads to list by impact.")
+    parser.add_argument(
+        "--cron-overlap",
+        type=int,
+        default=DEFAULT_CRON_OVERLAP,
+        help="Concurrent runs assumed for CronJobs with concurrencyPolicy Allow.",
+    )
+    parser.add_argument(
+        "--fail-on-shortfall",
+        action="store_true",
+        help="Exit 2 when requests exceed allocatable capacity in any node pool.",
+    )
+    parser.add_argument("--emit-quota", help="Write ResourceQuota/LimitRange manifests to this path.")
+    parser.add_argument(
+        "--quota-headroom",
+        type=float,
+        default=DEFAULT_QUOTA_HEADROOM,
+        help="Fraction added on top of current totals for the ResourceQuota.",
+    )
+    parser.add_argument(
+        "--limit-range-preset",
+        default=DEFAULT_LIMIT_RANGE_PRESET,
+        help="Catalog preset used for LimitRange container defaults.",
+    )
+    parser.add_argument("--emit-presets", help="Write a resourcePresets catalog to this path.")
+    parser.add_argument("--cpu-request-ratio", type=float, default=DEFAULT_CPU_REQUEST_RATIO)
+    parser.add_argument("--memory-request-ratio", type=float, default=DEFAULT_MEMORY_REQUEST_RATIO)
+    return parser.parse_args()
+
+
+def collect_config_paths(entries: list[str]) -> list[Path]:
+    paths: list[Path] = []
+    for entry in entries:
+        path = Path(entry)
+        if path.is_dir():
+            paths.extend(
+                sorted(p for p in path.iterdir() if p.suffix in {".yaml", ".yml", ".json"})
+            )
+        elif path.is_file():
+            paths.append(path)
+        else:
+            raise ValueError(f"Config path not found: {entry}")
+    if not paths:
+        raise ValueError("No AppConfig files found")
+    return paths
+
+
+def load_yaml(path: Path) -> Any:
+    return yaml.safe_load(path.read_text(encoding="utf-8"))
+
+
+def resolve_resources(workload: dict[str, Any], presets: dict[str, Any]) -> dict[str, Any]:
+    """Mirror the chart's app.resolveResources helper."""
+    resources = workload.get("resources") or {}
+    resolved: dict[str, Any] = {}
+    if resources.get("requests"):
+        resolved["requests"] = resources["requests"]
+    if resources.get("limits"):
+        resolved["limits"] = resources["limits"]
+    if not resolved and resources.get("preset"):
+        preset = presets.get(resources["preset"]) or {}
+        if preset.get("requests"):
+            resolved["requests"] = preset["requests"]
+        if preset.get("limits"):
+            resolved["limits"] = preset["limits"]
+    return resolved
+
+
+def effective_amounts(resolved: dict[str, Any]) -> dict[str, int]:
+    """Apply Kubernetes defaulting: a missing request falls back to the limit."""
+    requests = resolved.get("requests") or {}
+    limits = resolved.get("limits") or {}
+    amounts: dict[str, int] = {}
+    for resource, parse in (("cpu", parse_cpu), ("memory", parse_memory)):
+        limit = parse(limits[resource]) if limits.get(resource) else 0
+        request = parse(requests[resource]) if requests.get(resource) else limit
+        amounts[f"{resource}Request"] = request
+        amounts[f"{resource}Limit"] = limit
+    return amounts
+
+
+def peak_replicas(workload: dict[str, Any], cron_overlap: int) -> int:
+    workload_type = workload.get("type", "Deployment")
+    if workload_type == "CronJob":
+        policy = str(workload.get("concurrencyPolicy") or "Allow")
+        return 1 if policy in {"Forbid", "Replace"} else max(1, cron_overlap)
+    if workload_type == "Job":
+        return 1
+    return int(workload.get("replicas", 1) or 0)
+
+
+def load_node_pools(path: Path) -> list[dict[str, Any]]:
+    inventory = load_yaml(path) or {}
+    raw_pools = inventory.get("nodePools") if isinstance(inventory, dict) else None
+    if not isinstance(raw_pools, list) or not raw_pools:
+        raise ValueError("Node inventory must define a non-empty nodePools list")
+
+    pools: list[dict[str, Any]] = []
+    for entry in raw_pools:
+        name = str(entry.get("name") or "").strip()
+        if not name:
+            raise ValueError("Every node pool requires a name")
+        count = int(entry.get("count", 1))
+        allocatable = entry.get("allocatable") or entry.get("capacity") or {}
+        if not allocatable.get("cpu") or not allocatable.get("memory"):
+            raise ValueError(f"Node pool '{name}' requires allocatable cpu and memory")
+        reserved = entry.get("systemReserved") or {}
+        node_cpu = parse_cpu(allocatable["cpu"]) - parse_cpu(reserved.get("cpu") or 0)
+        node_memory = parse_memory(allocatable["memory"]) - parse_memory(reserved.get("memory") or 0)
+        if node_cpu <= 0 or node_memory <= 0:
+            raise ValueError(f"Node pool '{name}' has no capacity left after systemReserved")
+        pools.append(
+            {
+                "name": name,
+                "count": count,
+                "labels": {str(k): str(v) for k, v in (entry.get("labels") or {}).items()},
+                "nodeCpu": node_cpu,
+                "nodeMemory": node_memory,
+                "cpuAllocatable": node_cpu * count,
+                "memoryAllocatable": node_memory * count,
+                "cpuRequest": 0,
+                "cpuLimit": 0,
+                "memoryRequest": 0,
+                "memoryLimit": 0,
+                "workloads": 0,
+            }
+        )
+    return pools
+
+
+def matching_pools(workload: dict[str, Any], pools: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    selector = {str(k): str(v) for k, v in (workload.get("nodeSelector") or {}).items()}
+    return [
+        pool
+        for pool in pools
+        if all(pool["labels"].get(key) == value for key, value in selector.items())
+    ]
+
+
+def plan_workloads(
+    config_paths: list[Path],
+    pools: list[dict[str, Any]],
+    cron_overlap: int,
+) -> tuple[list[dict[str, Any]], list[str], dict[str, dict[str, int]]]:
+    rows: list[dict[str, Any]] = []
+    warnings: list[str] = []
+    namespaces: dict[str, dict[str, int]] = {}
+
+    for path in config_paths:
+        config = load_yaml(path) or {}
+        spec = config.get("spec") or {}
+        global_cfg = spec.get("global") or {}
+        presets = global_cfg.get("resourcePresets") or {}
+        app_name = str(global_cfg.get("name") or (config.get("metadata") or {}).get("name") or path.stem)
+        namespace = str(global_cfg.get("namespace") or app_name)
+
+        for workload in spec.get("workloads") or []:
+            amounts = effective_amounts(resolve_resources(workload, presets))
+            replicas = peak_replicas(workload, cron_overlap)
+            row = {
+                "app": app_name,
+                "namespace": namespace,
+                "workload": str(workload.get("name")),
+                "type": workload.get("type", "Deployment"),
+                "replicas": replicas,
+                **amounts,
+                "totalCpuRequest": amounts["cpuRequest"] * replicas,
+                "totalCpuLimit": amounts["cpuLimit"] * replicas,
+                "totalMemoryRequest": amounts["memoryRequest"] * replicas,
+                "totalMemoryLimit": amounts["memoryLimit"] * replicas,
+                "pools": [],
+            }
+            label = f"{app_name}/{row['workload']}"
+            if not amounts["cpuRequest"] and not amounts["memoryRequest"]:
+                warnings.append(f"{label}: no requests or limits; pods are BestEffort")
+
+            candidates = matching_pools(workload, pools)
+            if not candidates:
+                warnings.append(f"{label}: nodeSelector matches no node pool")
+            else:
+                # Spread the load over matching pools in proportion to node count.
+                total_nodes = sum(pool["count"] for pool in candidates)
+                for pool in candidates:
+                    share = pool["count"] / total_nodes
+                    for key in ("cpuRequest", "cpuLimit", "memoryRequest", "memoryLimit"):
+                        pool[key] += amounts[key] * replicas * share
+                    pool["workloads"] += 1
+                row["pools"] = [pool["name"] for pool in candidates]
+
+                largest_cpu = max(pool["nodeCpu"] for pool in candidates)
+                largest_memory = max(pool["nodeMemory"] for pool in candidates)
+                if amounts["cpuRequest"] > largest_cpu or amounts["memoryRequest"] > largest_memory:
+                    warnings.append(f"{label}: a single pod does not fit on any matching node")
+                # The chart adds required hostname anti-affinity when replicas > 1.
+                if row["type"] == "Deployment" and replicas > 1 and replicas > total_nodes:
+                    warnings.append(
+                        f"{label}: {replicas} replicas need {replicas} nodes for hostname "
+                        f"anti-affinity but only {total_nodes} match"
+                    )
+
+            ns_totals = namespaces.setdefault(
+                namespace,
+                {"cpuRequest": 0, "cpuLimit": 0, "memoryRequest": 0, "memoryLimit": 0, "pods": 0},
+            )
+            ns_totals["cpuRequest"] += row["totalCpuRequest"]
+            ns_totals["cpuLimit"] += row["totalCpuLimit"]
+            ns_totals["memoryRequest"] += row["totalMemoryRequest"]
+            ns_totals["memoryLimit"] += row["totalMemoryLimit"]
+            ns_totals["pods"] += replicas
+            rows.append(row)
+
+    total_cpu = sum(pool["cpuAllocatable"] for pool in pools) or 1
+    total_memory = sum(pool["memoryAllocatable"] for pool in pools) or 1
+    for row in rows:
+        row["impact"] = round(
+            max(row["totalCpuRequest"] / total_cpu, row["totalMemoryRequest"] / total_memory), 4
+        )
+    rows.sort(key=lambda row: (-row["impact"], row["app"], row["workload"]))
+    return rows, warnings, namespaces
+
+
+def summarize_pools(pools: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    summary: list[dict[str, Any]] = []
+    for pool in pools:
+        cpu_request = int(round(pool["cpuRequest"]))
+        memory_request = int(round(pool["memoryRequest"]))
+        summary.append(
+            {
+                "name": pool["name"],
+                "nodes": pool["count"],
+                "workloads": pool["workloads"],
+                "cpuAllocatable": pool["cpuAllocatable"],
+                "cpuRequest": cpu_request,
+                "cpuLimit": int(round(pool["cpuLimit"])),
+                "cpuHeadroom": pool["cpuAllocatable"] - cpu_request,
+                "memoryAllocatable": pool["memoryAllocatable"],
+                "memoryRequest": memory_request,
+                "memoryLimit": int(round(pool["memoryLimit"])),
+                "memoryHeadroom": pool["memoryAllocatable"] - memory_request,
+            }
+        )
+    return summary
+
+
+def build_preset_catalog(cpu_ratio: float, memory_ratio: float) -> dict[str, Any]:
+    if not 0 < cpu_ratio <= 1 or not 0 < memory_ratio <= 1:
+        raise ValueError("Request ratios must be within (0, 1]")
+    catalog: dict[str, Any] = {}
+    for name, cpu_limit, memory_limit in PRESET_LIMITS:
+        catalog[name] = {
+            "requests": {
+                "cpu": format_cpu(parse_cpu(cpu_limit) * cpu_ratio),
+                "memory": format_memory(parse_memory(memory_limit) * memory_ratio),
+            },
+            "limits": {"cpu": cpu_limit, "memory": memory_limit},
+        }
+    return catalog
+
+
+def suggest_preset(row: dict[str, Any]) -> str | None:
+    # Without any limit there is nothing to size a preset from.
+    if not row["cpuLimit"] and not row["memoryLimit"]:
+        return None
+    for name, cpu_limit, memory_limit in PRESET_LIMITS:
+        if row["cpuLimit"] <= parse_cpu(cpu_limit) and row["memoryLimit"] <= parse_memory(memory_limit):
+            return name
+    return None
+
+
+def build_quota_manifests(
+    namespaces: dict[str, dict[str, int]],
+    headroom: float,
+    limit_range_preset: dict[str, Any],
+) -> list[dict[str, Any]]:
+    factor = 1 + headroom
+    manifests: list[dict[str, Any]] = []
+    for namespace, totals in sorted(namespaces.items()):
+        manifests.append(
+            {
+                "apiVersion": "v1",
+                "kind": "ResourceQuota",
+                "metadata": {"name": "capacity-plan", "namespace": namespace},
+                "spec": {
+                    "hard": {
+                        "requests.cpu": format_cpu(round_up_cpu(totals["cpuRequest"] * factor)),
+                        "requests.memory": format_memory(
+                            round_up_memory(totals["memoryRequest"] * factor)
+                        ),
+                        "limits.cpu": format_cpu(round_up_cpu(totals["cpuLimit"] * factor)),
+                        "limits.memory": format_memory(
+                            round_up_memory(totals["memoryLimit"] * factor)
+                        ),
+                        "pods": str(int(totals["pods"] * factor) + 1),
+                    }
+                },
+            }
+        )
+        manifests.append(
+            {
+                "apiVersion": "v1",
+                "kind": "LimitRange",
+                "metadata": {"name": "capacity-plan", "namespace": namespace},
+                "spec": {
+                    "limits": [
+                        {
+                            "type": "Container",
+                            "default": dict(limit_range_preset["limits"]),
+                            "defaultRequest": dict(limit_range_preset["requests"]),
+                        }
+                    ]
+                },
+            }
+        )
+    return manifests
+
+
+def format_report(
+    pools: list[dict[str, Any]],
+    rows: list[dict[str, Any]],
+    warnings: list[str],
+    top: int,
+) -> str:
+    lines = ["Node pools (requests/limits include peak replicas):"]
+    header = (
+        f"{'pool':<16}{'nodes':>6}{'cpu alloc':>11}{'cpu req':>10}{'cpu lim':>10}"
+        f"{'cpu free':>10}{'mem alloc':>11}{'mem req':>10}{'mem lim':>10}{'mem free':>10}"
+    )
+    lines.append(header)
+    for pool in pools:
+        lines.append(
+            f"{pool['name']:<16}{pool['nodes']:>6}"
+            f"{format_cpu(pool['cpuAllocatable']):>11}{format_cpu(pool['cpuRequest']):>10}"
+            f"{format_cpu(pool['cpuLimit']):>10}{signed_cpu(pool['cpuHeadroom']):>10}"
+            f"{format_memory_mi(pool['memoryAllocatable']):>11}"
+            f"{format_memory_mi(pool['memoryRequest']):>10}"
+            f"{format_memory_mi(pool['memoryLimit']):>10}"
+            f"{signed_memory(pool['memoryHeadroom']):>10}"
+        )
+
+    lines.append("")
+    lines.append(f"Top {min(top, len(rows))} workloads by share of cluster requests:")
+    for row in rows[:top]:
+        preset = row.get("suggestedPreset") or "-"
+        label = f"{row['app']}/{row['workload']}"
+        lines.append(
+            f"  {label:<32} {row['type']:<10} x{row['replicas']:<3} "
+            f"cpu {format_cpu(row['totalCpuRequest'])}/{format_cpu(row['totalCpuLimit'])} "
+            f"mem {format_memory_mi(row['totalMemoryRequest'])}/"
+            f"{format_memory_mi(row['totalMemoryLimit'])} "
+            f"impact {row['impact'] * 100:.1f}% preset {preset}"
+        )
+
+    if warnings:
+        lines.append("")
+        lines.append("Warnings:")
+        lines.extend(f"  - {warning}" for warning in warnings)
+    return "\n".join(lines)
+
+
+def format_memory_mi(num_bytes: int) -> str:
+    return f"{int(round(num_bytes / 1024**2))}Mi"
+
+
+def signed_cpu(millicores: int) -> str:
+    return f"-{format_cpu(-millicores)}" if millicores < 0 else format_cpu(millicores)
+
+
+def signed_memory(num_bytes: int) -> str:
+    return f"-{format_memory_mi(-num_bytes)}" if num_bytes < 0 else format_memory_mi(num_bytes)
+
+
+def write_yaml_documents(path: str, documents: list[Any]) -> None:
+    output_path = Path(path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(
+        yaml.safe_dump_all(documents, sort_keys=False, explicit_start=True), encoding="utf-8"
+    )
+
+
+def main() -> int:
+    args = parse_args()
+    pools = load_node_pools(Path(args.nodes))
+    rows, warnings, namespaces = plan_workloads(
+        collect_config_paths(args.config), pools, args.cron_overlap
+    )
+    pool_summary = summarize_pools(pools)
+    for row in rows:
+        row["suggestedPreset"] = suggest_preset(row)
+
+    catalog = build_preset_catalog(args.cpu_request_ratio, args.memory_request_ratio)
+    if args.emit_presets:
+        write_yaml_documents(args.emit_presets, [{"resourcePresets": catalog}])
+    if args.emit_quota:
+        if args.limit_range_preset not in catalog:
+            raise ValueError(f"Unknown limit range preset: {args.limit_range_preset}")
+        write_yaml_documents(
+            args.emit_quota,
+            build_quota_manifests(namespaces, args.quota_headroom, catalog[args.limit_range_preset]),
+        )
+
+    if args.format == "json":
+        print(
+            json.dumps(
+                {"nodePools": pool_summary, "workloads": rows, "warnings": warnings},
+                indent=2,
+            )
+        )
+    else:
+        print(format_report(pool_summary, rows, warnings, args.top))
+
+    shortfall = any(
+        pool["cpuHeadroom"] < 0 or pool["memoryHeadroom"] < 0 for pool in pool_summary
+    )
+    if shortfall and args.fail_on_shortfall:
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # pragma: no cover
+        print(f"ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
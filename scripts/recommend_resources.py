@@ -0,0 +1,420 @@
+#!/usr/bin/env python
+"""Recommend workload requests/limits from exported usage metrics.
+
+Inputs are Prometheus range-query responses saved as JSON, for example:
+
+  sum by (pod, label_app_kubernetes_io_component) (
+    rate(container_cpu_usage_seconds_total{namespace="demo", container!=""}[5m])
+    * on (pod) group_left (label_app_kubernetes_io_component) kube_pod_labels
+  )
+
+Series are joined to AppConfig workloads through the app.kubernetes.io/component
+label the chart sets on every pod (falling back to the container name, which the
+chart also sets to the workload name). Samples are folded into log-bucketed
+histograms while the export is streamed, so memory stays flat for large exports.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import sys
+from pathlib import Path
+from typing import Any, Iterator, TextIO
+
+import yaml
+
+from k8s_quantity import format_cpu, format_memory, round_up_cpu, round_up_memory
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional streaming parser
+    ijson = None
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - optional vectorized aggregation
+    numpy = None
+
+
+COMPONENT_LABELS = [
+    "label_app_kubernetes_io_component",
+    "app_kubernetes_io_component",
+    "app.kubernetes.io/component",
+    "component",
+    "container",
+]
+HISTOGRAM_GROWTH = 1.01
+READ_CHUNK_SIZE = 1 << 20
+RESULT_ARRAY_RE = re.compile(r'"result"\s*:\s*\[')
+SERIES_SEPARATORS = frozenset(", \t\r\n")
+
+DEFAULT_CPU_REQUEST_PERCENTILE = 90.0
+DEFAULT_CPU_LIMIT_PERCENTILE = 99.0
+DEFAULT_MEMORY_REQUEST_PERCENTILE = 95.0
+DEFAULT_MEMORY_LIMIT_PERCENTILE = 100.0
+DEFAULT_HEADROOM = 0.15
+DEFAULT_MEMORY_LIMIT_HEADROOM = 0.25
+DEFAULT_MIN_SAMPLES = 30
+MIN_CPU_MILLICORES = 10
+MIN_MEMORY_BYTES = 32 * 1024**2
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Recommend resources from usage metrics.")
+    parser.add_argument("--config", required=True, help="AppConfig YAML for the app.")
+    parser.add_argument(
+        "--cpu-metrics",
+        action="append",
+        default=[],
+        help="Prometheus range-query JSON with CPU usage in cores; repeatable.",
+    )
+    parser.add_argument(
+        "--memory-metrics",
+        action="append",
+        default=[],
+        help="Prometheus range-query JSON with memory working set in bytes; repeatable.",
+    )
+    parser.add_argument(
+        "--emit",
+        choices=["report", "patch", "payload"],
+        default="report",
+        help="report: text summary; patch: JSON Patch for the AppConfig; payload: annotated payload.",
+    )
+    parser.add_argument("--payload", help="deployed_apps_json file to annotate (--emit payload).")
+    parser.add_argument("--output", help="Write the patch/payload here instead of stdout.")
+    parser.add_argument("--cpu-request-percentile", type=float, default=DEFAULT_CPU_REQUEST_PERCENTILE)
+    parser.add_argument("--cpu-limit-percentile", type=float, default=DEFAULT_CPU_LIMIT_PERCENTILE)
+    parser.add_argument(
+        "--memory-request-percentile", type=float, default=DEFAULT_MEMORY_REQUEST_PERCENTILE
+    )
+    parser.add_argument(
+        "--memory-limit-percentile", type=float, default=DEFAULT_MEMORY_LIMIT_PERCENTILE
+    )
+    parser.add_argument("--headroom", type=float, default=DEFAULT_HEADROOM)
+    parser.add_argument(
+        "--memory-limit-headroom", type=float, default=DEFAULT_MEMORY_LIMIT_HEADROOM
+    )
+    parser.add_argument(
+        "--min-samples",
+        type=int,
+        default=DEFAULT_MIN_SAMPLES,
+        help="Skip workloads with fewer samples than this.",
+    )
+    return parser.parse_args()
+
+
+class LogHistogram:
+    """Fixed-memory quantile sketch with ~1% relative error."""
+
+    def __init__(self, growth: float = HISTOGRAM_GROWTH) -> None:
+        self.log_growth = math.log(growth)
+        self.growth = growth
+        self.buckets: dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.maximum = 0.0
+
+    def add_many(self, values: list[float]) -> None:
+        if not values:
+            return
+        if numpy is not None:
+            array = numpy.asarray(values, dtype=float)
+            array = array[numpy.isfinite(array)]
+            positive = array[array > 0]
+            self.zeros += int(array.size - positive.size)
+            self.count += int(array.size)
+            if positive.size:
+                self.maximum = max(self.maximum, float(positive.max()))
+                indexes = numpy.floor(numpy.log(positive) / self.log_growth).astype(int)
+                unique, counts = numpy.unique(indexes, return_counts=True)
+                for index, count in zip(unique.tolist(), counts.tolist()):
+                    self.buckets[index] = self.buckets.get(index, 0) + count
+            return
+
+        for value in values:
+            if not math.isfinite(value):
+                continue
+            self.count += 1
+            if value <= 0:
+                self.zeros += 1
+                continue
+            if value > self.maximum:
+                self.maximum = value
+            index = math.floor(math.log(value) / self.log_growth)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def percentile(self, pct: float) -> float:
+        if self.count == 0:
+            return 0.0
+        if pct >= 100:
+            return self.maximum
+        rank = math.ceil(self.count * pct / 100.0)
+        if rank <= self.zeros:
+            return 0.0
+        seen = self.zeros
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Report the bucket's upper bound so recommendations never undershoot.
+                return min(self.growth ** (index + 1), self.maximum)
+        return self.maximum
+
+
+def iter_series(handle: TextIO) -> Iterator[dict[str, Any]]:
+    """Yield series objects from data.result without loading the whole export."""
+    if ijson is not None:
+        yield from ijson.items(handle, "data.result.item", use_float=True)
+        return
+
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    while True:
+        match = RESULT_ARRAY_RE.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        if eof:
+            return
+        chunk = handle.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        # Keep a tail so the key is found even when split across chunks.
+        buffer = buffer[-32:] + chunk
+
+    # Walk the buffer by offset; only drop the consumed prefix when refilling,
+    # so each chunk is copied once instead of once per series.
+    index = 0
+    while True:
+        while index < len(buffer) and buffer[index] in SERIES_SEPARATORS:
+            index += 1
+        if index < len(buffer):
+            if buffer[index] == "]":
+                return
+            try:
+                series, end = decoder.raw_decode(buffer, index)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield series
+                index = end
+                continue
+        if eof:
+            raise ValueError("Unexpected end of metrics export")
+        chunk = handle.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[index:] + chunk
+        index = 0
+
+
+def series_component(labels: dict[str, Any], workload_names: set[str]) -> str | None:
+    for key in COMPONENT_LABELS:
+        value = labels.get(key)
+        if value and str(value) in workload_names:
+            return str(value)
+    return None
+
+
+def aggregate_metrics(
+    paths: list[str],
+    workload_names: set[str],
+    namespace: str,
+) -> tuple[dict[str, LogHistogram], int]:
+    histograms: dict[str, LogHistogram] = {}
+    unmatched = 0
+    for path in paths:
+        with Path(path).open("r", encoding="utf-8") as handle:
+            for series in iter_series(handle):
+                labels = series.get("metric") or {}
+                series_namespace = labels.get("namespace")
+                if series_namespace and series_namespace != namespace:
+                    continue
+                component = series_component(labels, workload_names)
+                if component is None:
+                    unmatched += 1
+                    continue
+                samples = series.get("values")
+                if samples is None and series.get("value") is not None:
+                    samples = [series["value"]]
+                values = [float(sample[1]) for sample in samples or []]
+                histograms.setdefault(component, LogHistogram()).add_many(values)
+    return histograms, unmatched
+
+
+def current_resources(workload: dict[str, Any], presets: dict[str, Any]) -> dict[str, Any]:
+    resources = workload.get("resources") or {}
+    if not resources.get("requests") and not resources.get("limits") and resources.get("preset"):
+        return presets.get(resources["preset"]) or {}
+    return resources
+
+
+def recommend(
+    cpu: LogHistogram | None,
+    memory: LogHistogram | None,
+    args: argparse.Namespace,
+) -> dict[str, Any]:
+    requests: dict[str, str] = {}
+    limits: dict[str, str] = {}
+    stats: dict[str, Any] = {}
+    factor = 1 + args.headroom
+
+    if cpu is not None and cpu.count >= args.min_samples:
+        cpu_request = max(
+            MIN_CPU_MILLICORES,
+            round_up_cpu(cpu.percentile(args.cpu_request_percentile) * 1000 * factor, 5),
+        )
+        cpu_limit = max(
+            cpu_request,
+            round_up_cpu(cpu.percentile(args.cpu_limit_percentile) * 1000 * factor, 5),
+        )
+        requests["cpu"] = format_cpu(cpu_request)
+        limits["cpu"] = format_cpu(cpu_limit)
+        stats["cpuSamples"] = cpu.count
+        stats["cpuMaxCores"] = round(cpu.maximum, 4)
+
+    if memory is not None and memory.count >= args.min_samples:
+        memory_request = max(
+            MIN_MEMORY_BYTES,
+            round_up_memory(memory.percentile(args.memory_request_percentile) * factor),
+        )
+        memory_limit = max(
+            memory_request,
+            round_up_memory(
+                memory.percentile(args.memory_limit_percentile) * (1 + args.memory_limit_headroom)
+            ),
+        )
+        requests["memory"] = format_memory(memory_request)
+        limits["memory"] = format_memory(memory_limit)
+        stats["memorySamples"] = memory.count
+        stats["memoryMaxBytes"] = int(memory.maximum)
+
+    return {"requests": requests, "limits": limits, "stats": stats}
+
+
+def merge_resources(current: dict[str, Any], recommendation: dict[str, Any]) -> dict[str, Any]:
+    """Keep current values for resources that had too few samples."""
+    merged: dict[str, Any] = {}
+    for section in ("requests", "limits"):
+        values = dict(current.get(section) or {})
+        values.update(recommendation[section])
+        if values:
+            merged[section] = dict(sorted(values.items()))
+    return merged
+
+
+def build_patch(config: dict[str, Any], results: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
+    operations: list[dict[str, Any]] = []
+    for index, workload in enumerate(config["spec"]["workloads"]):
+        result = results.get(str(workload.get("name")))
+        if not result:
+            continue
+        operations.append(
+            {
+                "op": "add",
+                "path": f"/spec/workloads/{index}/resources",
+                "value": result["resources"],
+            }
+        )
+    return operations
+
+
+def annotate_payload(payload: Any, results: dict[str, dict[str, Any]]) -> Any:
+    apps = payload if isinstance(payload, list) else [payload]
+    for app in apps:
+        for workload in app.get("workloads") or []:
+            name = str(workload.get("workload_name") or workload.get("name") or "")
+            result = results.get(name)
+            if not result:
+                continue
+            resources = result["resources"]
+            for section, prefix in (("requests", "request"), ("limits", "limit")):
+                for resource, value in (resources.get(section) or {}).items():
+                    workload[f"{resource}_{prefix}"] = value
+            workload["resource_recommendation"] = result["stats"]
+    return payload
+
+
+def format_report(results: dict[str, dict[str, Any]], skipped: list[str], unmatched: int) -> str:
+    lines = [f"{'workload':<28}{'current requests':<26}{'recommended requests':<26}recommended limits"]
+    for name, result in sorted(results.items()):
+        lines.append(
+            f"{name:<28}{describe(result['current'].get('requests')):<26}"
+            f"{describe(result['resources'].get('requests')):<26}"
+            f"{describe(result['resources'].get('limits'))}"
+        )
+    if skipped:
+        lines.append("")
+        lines.append("Skipped (not enough samples): " + ", ".join(sorted(skipped)))
+    if unmatched:
+        lines.append(f"Ignored {unmatched} series without a matching component label.")
+    return "\n".join(lines)
+
+
+def describe(values: dict[str, Any] | None) -> str:
+    if not values:
+        return "-"
+    return ", ".join(f"{key}={values[key]}" for key in ("cpu", "memory") if key in values) or "-"
+
+
+def write_output(text: str, output: str | None) -> None:
+    if not output:
+        print(text)
+        return
+    output_path = Path(output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(text, encoding="utf-8")
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.cpu_metrics and not args.memory_metrics:
+        raise ValueError("Provide --cpu-metrics and/or --memory-metrics")
+    if args.emit == "payload" and not args.payload:
+        raise ValueError("--emit payload requires --payload")
+
+    config = yaml.safe_load(Path(args.config).read_text(encoding="utf-8"))
+    spec = config["spec"]
+    presets = spec["global"].get("resourcePresets") or {}
+    namespace = spec["global"]["namespace"]
+    workloads = {str(workload["name"]): workload for workload in spec["workloads"]}
+    names = set(workloads)
+
+    cpu_histograms, cpu_unmatched = aggregate_metrics(args.cpu_metrics, names, namespace)
+    memory_histograms, memory_unmatched = aggregate_metrics(args.memory_metrics, names, namespace)
+
+    results: dict[str, dict[str, Any]] = {}
+    skipped: list[str] = []
+    for name, workload in workloads.items():
+        recommendation = recommend(cpu_histograms.get(name), memory_histograms.get(name), args)
+        if not recommendation["requests"]:
+            if name in cpu_histograms or name in memory_histograms:
+                skipped.append(name)
+            continue
+        current = current_resources(workload, presets)
+        results[name] = {
+            "current": current,
+            "resources": merge_resources(current, recommendation),
+            "stats": recommendation["stats"],
+        }
+
+    if args.emit == "patch":
+        write_output(
+            yaml.safe_dump(build_patch(config, results), sort_keys=False), args.output
+        )
+    elif args.emit == "payload":
+        payload = json.loads(Path(args.payload).read_text(encoding="utf-8"))
+        write_output(json.dumps(annotate_payload(payload, results), indent=2) + "\n", args.output)
+    else:
+        print(format_report(results, skipped, cpu_unmatched + memory_unmatched))
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # pragma: no cover
+        print(f"ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import re
+import shutil
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+import yaml
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+MIGRATE_SCRIPT = REPO_ROOT / "scripts" / "migrate_to_applicationset.py"
+ENVS = ("dev", "test", "prod")
+PRIVATE_REPO = "https://github.com/acme/gitops-private"
+
+
+def applicationset(env: str, root: Path = REPO_ROOT) -> dict:
+    path = root / "clusters" / env / "applications" / "apps" / "applicationset.yaml"
+    return yaml.safe_load(path.read_text(encoding="utf-8"))
+
+
+def legacy_application(namespace: str = "example") -> dict:
+    return {
+        "apiVersion": "argoproj.io/v1alpha1",
+        "kind": "Application",
+        "metadata": {
+            "name": "example",
+            "namespace": "argocd",
+            "finalizers": ["resources-finalizer.argocd.argoproj.io"],
+        },
+        "spec": {
+            "project": "cluster-dev",
+            "source": {
+                "repoURL": PRIVATE_REPO,
+                "targetRevision": "release",
+                "path": "charts/app",
+                "helm": {"valueFiles": ["../../config/apps/example.yaml"]},
+            },
+            "destination": {"server": "https://kubernetes.default.svc", "namespace": namespace},
+            "syncPolicy": {"automated": {"prune": True, "selfHeal": True}},
+        },
+    }
+
+
+class ApplicationSetTests(unittest.TestCase):
+    def test_envs_generate_one_application_per_config(self) -> None:
+        dev = applicationset("dev")
+        for env in ENVS:
+            appset = applicationset(env)
+            self.assertEqual(appset["spec"]["template"]["spec"]["project"], f"cluster-{env}")
+            appset["spec"]["template"]["spec"]["project"] = "cluster-dev"
+            self.assertEqual(appset, dev, env)
+            kustomization = yaml.safe_load(
+                (REPO_ROOT / "clusters" / env / "kustomization.yaml").read_text(encoding="utf-8")
+            )
+            self.assertIn("applications/apps/applicationset.yaml", kustomization["resources"])
+            self.assertFalse(
+                [entry for entry in kustomization["resources"] if entry.endswith("/example.yaml")]
+            )
+            self.assertIn("argocd-cmd-params-cm.yaml", kustomization["resources"])
+            params = yaml.safe_load(
+                (REPO_ROOT / "clusters" / env / "argocd-cmd-params-cm.yaml").read_text(encoding="utf-8")
+            )
+            self.assertEqual(
+                params["data"]["applicationsetcontroller.enable.progressive.syncs"], "true"
+            )
+            self.assertIn("ServerSideApply=true", params["metadata"]["annotations"].values())
+
+        spec = dev["spec"]
+        self.assertEqual(spec["generators"][0]["git"]["files"], [{"path": "config/apps/*.yaml"}])
+        # RollingSync overrides auto-sync only while progressive syncs are on.
+        self.assertEqual(
+            spec["template"]["spec"]["syncPolicy"]["automated"], {"prune": True, "selfHeal": True}
+        )
+        steps = [step["matchExpressions"][0]["values"] for step in spec["strategy"]["rollingSync"]["steps"]]
+        self.assertEqual(steps, [["canary"], ["default"]])
+
+        value_file = spec["template"]["spec"]["source"]["helm"]["valueFiles"][0]
+        for config_path in sorted((REPO_ROOT / "config" / "apps").glob("*.yaml")):
+            rendered = value_file.replace("{{ .path.path }}", "config/apps").replace(
+                "{{ .path.filename }}", config_path.name
+            )
+            self.assertTrue((REPO_ROOT / "charts" / "app" / rendered).resolve().is_file(), rendered)
+
+
+class MigrationTests(unittest.TestCase):
+    maxDiff = None
+
+    def setUp(self) -> None:
+        self.root = REPO_ROOT / ".tmp" / "tests" / "appset-migration"
+        shutil.rmtree(self.root, ignore_errors=True)
+        apps_dir = self.root / "clusters" / "dev" / "applications" / "apps"
+        apps_dir.mkdir(parents=True)
+        shutil.copy(REPO_ROOT / "clusters" / "dev" / "applications" / "apps" / "applicationset.yaml", apps_dir)
+        (self.root / "config" / "apps").mkdir(parents=True)
+        shutil.copy(REPO_ROOT / "config" / "apps" / "example.yaml", self.root / "config" / "apps")
+        self.kustomization_path = self.root / "clusters" / "dev" / "kustomization.yaml"
+        self.kustomization_path.write_text(
+            yaml.safe_dump(
+                {"resources": ["project.yaml", "applications/apps/example.yaml"]}, sort_keys=False
+            ),
+            encoding="utf-8",
+        )
+        self.legacy_path = apps_dir / "example.yaml"
+
+    def migrate(self, phase: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, str(MIGRATE_SCRIPT), phase, "--env", "dev", "--repo-root", str(self.root)],
+            cwd=str(REPO_ROOT),
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+
+    def test_prepare_then_finalize_hands_applications_over(self) -> None:
+        self.legacy_path.write_text(yaml.safe_dump(legacy_application()), encoding="utf-8")
+        result = self.migrate("finalize")
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("run prepare first", result.stderr)
+
+        result = self.migrate("prepare")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        metadata = yaml.safe_load(self.legacy_path.read_text(encoding="utf-8"))["metadata"]
+        self.assertEqual(metadata["annotations"], {"argocd.argoproj.io/sync-options": "Prune=false"})
+        self.assertNotIn("finalizers", metadata)
+
+        result = self.migrate("finalize")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertFalse(self.legacy_path.exists())
+        kustomization = yaml.safe_load(self.kustomization_path.read_text(encoding="utf-8"))
+        self.assertEqual(
+            kustomization["resources"], ["project.yaml", "applications/apps/applicationset.yaml"]
+        )
+        spec = applicationset("dev", self.root)["spec"]
+        self.assertEqual(spec["generators"][0]["git"]["repoURL"], PRIVATE_REPO)
+        self.assertEqual(spec["generators"][0]["git"]["revision"], "release")
+        self.assertEqual(spec["template"]["spec"]["source"]["targetRevision"], "release")
+        self.assertIn("Handed 1 Application(s) over", result.stdout)
+        self.assertIn(
+            "kubectl -n argocd label application example app.kubernetes.io/instance-", result.stdout
+        )
+        self.assertIn(
+            "kubectl -n argocd annotate application example argocd.argoproj.io/tracking-id- "
+            "argocd.argoproj.io/sync-options-",
+            result.stdout,
+        )
+
+    def test_prepare_keeps_comments_and_key_order(self) -> None:
+        manifest = (
+            "# Hand-maintained; owned by the web team.\n"
+            "apiVersion: argoproj.io/v1alpha1\n"
+            "kind: Application\n"
+            "metadata:\n"
+            "  name: example\n"
+            "  namespace: argocd\n"
+            "  annotations:\n"
+            "    notifications.argoproj.io/subscribe.on-sync-failed.slack: web  # alerts\n"
+            "    argocd.argoproj.io/sync-options: ServerSideApply=true\n"
+            "  finalizers:\n"
+            "  - resources-finalizer.argocd.argoproj.io\n"
+            "  - example.com/keep\n"
+            "spec:\n"
+            "  # Pinned until the chart bump lands.\n"
+            "  project: cluster-dev\n"
+        )
+        self.legacy_path.write_text(manifest, encoding="utf-8")
+        result = self.migrate("prepare")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertNotIn("rewritten", result.stdout)
+        self.assertEqual(
+            self.legacy_path.read_text(encoding="utf-8"),
+            manifest.replace(
+                "sync-options: ServerSideApply=true", "sync-options: ServerSideApply=true,Prune=false"
+            ).replace("  - resources-finalizer.argocd.argoproj.io\n", ""),
+        )
+
+        # Without annotations or other finalizers the keys are added/removed.
+        self.legacy_path.write_text(
+            manifest.replace(
+                "  annotations:\n"
+                "    notifications.argoproj.io/subscribe.on-sync-failed.slack: web  # alerts\n"
+                "    argocd.argoproj.io/sync-options: ServerSideApply=true\n",
+                "",
+            ).replace("  - example.com/keep\n", ""),
+            encoding="utf-8",
+        )
+        result = self.migrate("prepare")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn(
+            "  namespace: argocd\n"
+            "  annotations:\n"
+            "    argocd.argoproj.io/sync-options: Prune=false\n"
+            "spec:\n"
+            "  # Pinned until the chart bump lands.\n",
+            self.legacy_path.read_text(encoding="utf-8"),
+        )
+
+    def test_finalize_refuses_destination_change(self) -> None:
+        application = legacy_application(namespace="legacy")
+        application["metadata"]["annotations"] = {"argocd.argoproj.io/sync-options": "Prune=false"}
+        del application["metadata"]["finalizers"]
+        self.legacy_path.write_text(yaml.safe_dump(application), encoding="utf-8")
+
+        result = self.migrate("finalize")
+        self.assertEqual(result.returncode, 1)
+        self.assertRegex(
+            result.stderr,
+            re.escape("example: destination namespace legacy != spec.global.namespace example"),
+        )
+        self.assertTrue(self.legacy_path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
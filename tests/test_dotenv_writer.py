@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+import shutil
+import stat
+import subprocess
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CHART_FILES = REPO_ROOT / "charts" / "app" / "files"
+WRITERS = ("loop", "awk")
+
+SECRET_FILES = {
+    "PLAIN": b"value\n",
+    "NO_TRAILING_NEWLINE": b"value",
+    "EMPTY": b"",
+    "ONLY_NEWLINES": b"\n\n",
+    "QUOTES_AND_BACKSLASHES": b'a"b\\c\n"d"\\e\n',
+    "PEM": b"-----BEGIN KEY-----\nAAAA\nBBBB\n-----END KEY-----\n",
+    "CRLF": b"first\r\nsecond\r\n",
+    "SHELL_META": b"$HOME `id` %s %d \\n\n\n",
+    "UNICODE": "h\u00e9llo \u2603\n".encode("utf-8"),
+}
+
+
+def run_writer(writer: str, secrets_dir: Path, out_file: Path) -> subprocess.CompletedProcess:
+    env = dict(os.environ, SECRETS_DIR=str(secrets_dir), OUT_FILE=str(out_file))
+    script = CHART_FILES / f"dotenv-writer-{writer}.sh"
+    return subprocess.run(
+        ["sh", str(script)], cwd=str(REPO_ROOT), env=env, capture_output=True, check=False
+    )
+
+
+@unittest.skipUnless(
+    shutil.which("sh") and shutil.which("sed") and shutil.which("awk"),
+    "sh, sed and awk are required",
+)
+class DotenvWriterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = REPO_ROOT / ".tmp" / "tests" / "dotenv-writer"
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        self.secrets_dir = self.tmp_dir / "secrets"
+        self.secrets_dir.mkdir(parents=True)
+
+    def write_secrets(self) -> None:
+        # Mimic the CSI layout: keys are symlinks into a data directory.
+        data_dir = self.secrets_dir / "..data"
+        data_dir.mkdir()
+        for key, content in SECRET_FILES.items():
+            (data_dir / key).write_bytes(content)
+            (self.secrets_dir / key).symlink_to(Path("..data") / key)
+        (self.secrets_dir / "nested").mkdir()
+        (self.secrets_dir / "DANGLING").symlink_to("missing")
+
+    def test_writers_produce_identical_output(self) -> None:
+        self.write_secrets()
+        outputs = {}
+        for writer in WRITERS:
+            out_file = self.tmp_dir / f"{writer}.env"
+            result = run_writer(writer, self.secrets_dir, out_file)
+            self.assertEqual(result.returncode, 0, result.stderr.decode())
+            self.assertEqual(stat.S_IMODE(out_file.stat().st_mode), 0o444)
+            outputs[writer] = out_file.read_bytes()
+
+        self.assertEqual(outputs["awk"], outputs["loop"])
+        lines = outputs["awk"].decode("utf-8").split("\n")[:-1]
+        self.assertEqual(
+            [line.split("=", 1)[0] for line in lines], sorted(SECRET_FILES)
+        )
+        self.assertIn('NO_TRAILING_NEWLINE="value"', lines)
+        self.assertIn('ONLY_NEWLINES="\\n"', lines)
+        self.assertIn('PEM="-----BEGIN KEY-----\\nAAAA\\nBBBB\\n-----END KEY-----"', lines)
+
+    def test_writers_handle_empty_directory(self) -> None:
+        for writer in WRITERS:
+            out_file = self.tmp_dir / f"{writer}.env"
+            result = run_writer(writer, self.secrets_dir, out_file)
+            self.assertEqual(result.returncode, 0, result.stderr.decode())
+            self.assertEqual(out_file.read_bytes(), b"")
+
+    def test_writers_fail_without_secrets_directory(self) -> None:
+        for writer in WRITERS:
+            result = run_writer(writer, self.tmp_dir / "absent", self.tmp_dir / f"{writer}.env")
+            self.assertNotEqual(result.returncode, 0)
+            self.assertIn(b"Secrets directory not found", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
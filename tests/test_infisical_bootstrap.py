@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import base64
+import json
+import os
+import subprocess
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import yaml
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+BOOTSTRAP_SCRIPT = REPO_ROOT / "scripts" / "infisical_k8s_auth_bootstrap.py"
+SECRETS_PATH = "/api/v1/namespaces/kube-system/secrets"
+ORG_ID = "00000000-0000-0000-0000-0000000000aa"
+
+
+def b64(value: str) -> str:
+    return base64.b64encode(value.encode("utf-8")).decode("ascii")
+
+
+def secret(name: str, **data: str) -> dict:
+    return {
+        "metadata": {"name": name, "namespace": "kube-system"},
+        "data": {key: b64(value) for key, value in data.items()},
+    }
+
+
+class FakeServer:
+    """Threaded HTTP/1.1 server that records requests and counts connections."""
+
+    def __init__(self) -> None:
+        self.requests: list[tuple[str, str]] = []
+        self.connections = 0
+        self.failures: list[tuple[int, dict[str, str]]] = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                fake.connections += 1
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def handle_any(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                fake.requests.append((self.command, self.path))
+                if fake.failures:
+                    status, headers = fake.failures.pop(0)
+                    self.reply(status, {"message": "unavailable"}, headers)
+                    return
+                parts = urlsplit(self.path)
+                status, payload = fake.route(self.command, parts.path, parse_qs(parts.query), body)
+                self.reply(status, payload)
+
+            def reply(self, status: int, payload: object, headers: dict | None = None) -> None:
+                raw = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            do_GET = do_POST = do_PATCH = handle_any
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def writes(self) -> list[tuple[str, str]]:
+        return [item for item in self.requests if item[0] != "GET"]
+
+    def route(self, method: str, path: str, query: dict, body: object) -> tuple[int, object]:
+        raise NotImplementedError
+
+
+class FakeKube(FakeServer):
+    def __init__(self, infisical_url: str) -> None:
+        super().__init__()
+        self.secrets = {
+            item["metadata"]["name"]: item
+            for item in (
+                secret("infisical-admin-token", host=infisical_url + "/", token="admin-token"),
+                secret("infisical-organization", infisical_organization="acme"),
+                secret("infisical-project-name", value="platform"),
+            )
+        }
+        self.namespaces = ["default", "demo", "kube-system", "argocd"]
+        self.service_accounts = [
+            ("default", "default"),
+            ("demo", "demo-web"),
+            ("demo", "default"),
+            ("kube-system", "infisical-token-reviewer"),
+            ("argocd", "argocd-server"),
+        ]
+
+    def route(self, method: str, path: str, query: dict, body: object) -> tuple[int, object]:
+        if method == "GET" and path == SECRETS_PATH:
+            return 200, {"metadata": {}, "items": list(self.secrets.values())}
+        if method == "POST" and path == SECRETS_PATH:
+            name = body["metadata"]["name"]
+            data = {key: b64(value) for key, value in (body.get("stringData") or {}).items()}
+            if body.get("type") == "kubernetes.io/service-account-token":
+                data["token"] = b64("reviewer-jwt")
+            self.secrets[name] = {"metadata": body["metadata"], "data": data}
+            return 201, self.secrets[name]
+        if path.startswith(SECRETS_PATH + "/"):
+            name = path.rsplit("/", 1)[1]
+            if name not in self.secrets:
+                return 404, {"reason": "NotFound"}
+            if method == "PATCH":
+                for key, value in (body.get("stringData") or {}).items():
+                    self.secrets[name]["data"][key] = b64(value)
+            return 200, self.secrets[name]
+        if path == "/api/v1/namespaces":
+            return 200, {"items": [{"metadata": {"name": ns}} for ns in self.namespaces]}
+        if path == "/api/v1/serviceaccounts":
+            items = [
+                {"metadata": {"namespace": ns, "name": name}} for ns, name in self.service_accounts
+            ]
+            return 200, {"items": items}
+        if path.endswith("/clusterrolebindings/infisical-token-reviewer-auth-delegator"):
+            return 200, {"metadata": {"name": "infisical-token-reviewer-auth-delegator"}}
+        return 404, {"reason": "NotFound"}
+
+
+class FakeInfisical(FakeServer):
+    def __init__(self) -> None:
+        super().__init__()
+        self.projects: list[dict] = [{"id": "p-other", "name": "other", "orgId": ORG_ID}]
+        self.identities: list[dict] = []
+        self.memberships: dict[str, list[dict]] = {}
+        self.auth: dict[str, dict] = {}
+
+    def route(self, method: str, path: str, query: dict, body: object) -> tuple[int, object]:
+        if path == "/api/v1/projects":
+            if method == "POST":
+                project = {"id": "p-1", "name": body["projectName"], "orgId": ORG_ID}
+                self.projects.append(project)
+                return 200, {"project": project}
+            return 200, {"projects": self.projects}
+        if path == "/api/v1/identities":
+            if method == "POST":
+                identity = {"identityId": "i-1", "identity": {"id": "i-1", "name": body["name"]}}
+                self.identities.append(identity)
+                return 200, {"identity": identity["identity"]}
+            return 200, {"identities": self.identities}
+        if path.startswith("/api/v1/projects/p-1/memberships/identities/"):
+            identity_id = path.rsplit("/", 1)[1]
+            if method == "GET":
+                if identity_id not in self.memberships:
+                    return 404, {"message": "not found"}
+            elif method == "POST":
+                self.memberships[identity_id] = [{"role": body["role"]}]
+            else:
+                self.memberships[identity_id] = [{"role": r["role"]} for r in body["roles"]]
+            return 200, {"identityMembership": {"roles": self.memberships[identity_id]}}
+        if path.startswith("/api/v1/auth/kubernetes-auth/identities/"):
+            identity_id = path.rsplit("/", 1)[1]
+            if method == "GET" and identity_id not in self.auth:
+                return 404, {"message": "not found"}
+            if method != "GET":
+                self.auth[identity_id] = dict(body)
+            # Like Infisical, never echo the reviewer JWT back.
+            visible = {k: v for k, v in self.auth[identity_id].items() if k != "tokenReviewerJwt"}
+            return 200, {"identityKubernetesAuth": visible}
+        return 404, {"message": "not found"}
+
+
+class InfisicalBootstrapTests(unittest.TestCase):
+    maxDiff = None
+
+    def setUp(self) -> None:
+        self.infisical = FakeInfisical()
+        self.kube = FakeKube(self.infisical.url)
+        self.addCleanup(self.infisical.stop)
+        self.addCleanup(self.kube.stop)
+        self.sa_dir = REPO_ROOT / ".tmp" / "tests" / "bootstrap-sa"
+        self.sa_dir.mkdir(parents=True, exist_ok=True)
+        (self.sa_dir / "token").write_text("bootstrap-sa-token\n", encoding="utf-8")
+        (self.sa_dir / "ca.crt").write_text("-----BEGIN CERTIFICATE-----\nCA\n", encoding="utf-8")
+
+    def run_bootstrap(self) -> subprocess.CompletedProcess:
+        env = dict(
+            os.environ,
+            INFRAZERO_ENV="dev",
+            KUBE_API_URL=self.kube.url,
+            SERVICE_ACCOUNT_DIR=str(self.sa_dir),
+            API_RETRY_DELAY="0",
+        )
+        return subprocess.run(
+            [sys.executable, str(BOOTSTRAP_SCRIPT)],
+            cwd=str(REPO_ROOT),
+            env=env,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+
+    def test_first_run_converges_and_rerun_is_noop(self) -> None:
+        result = self.run_bootstrap()
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        self.assertEqual(
+            self.infisical.writes(),
+            [
+                ("POST", "/api/v1/projects"),
+                ("POST", "/api/v1/identities"),
+                ("POST", "/api/v1/projects/p-1/memberships/identities/i-1"),
+                ("POST", "/api/v1/auth/kubernetes-auth/identities/i-1"),
+            ],
+        )
+        self.assertEqual(
+            self.infisical.auth["i-1"],
+            {
+                "kubernetesHost": "https://kubernetes.default.svc",
+                "caCert": "-----BEGIN CERTIFICATE-----\nCA\n",
+                "tokenReviewerJwt": "reviewer-jwt",
+                "tokenReviewMode": "api",
+                "allowedNamespaces": "default,demo",
+                "allowedNames": "default,demo-web",
+                "allowedAudience": "infisical",
+            },
+        )
+        result_data = self.kube.secrets["infisical-bootstrap-result"]["data"]
+        self.assertEqual(base64.b64decode(result_data["identityId"]).decode(), "i-1")
+        self.assertEqual(base64.b64decode(result_data["orgInput"]).decode(), "acme")
+        # All kube-system inputs come from a single LIST call.
+        secret_reads = [path for method, path in self.kube.requests if path.startswith(SECRETS_PATH + "?")]
+        self.assertEqual(len(secret_reads), 1)
+        self.assertEqual(self.infisical.connections, 1)
+
+        self.infisical.requests.clear()
+        self.kube.requests.clear()
+        result = self.run_bootstrap()
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(self.infisical.writes(), [])
+        self.assertEqual(self.kube.writes(), [])
+        self.assertIn("(0 Infisical and 0 Kubernetes writes)", result.stderr)
+
+    def test_rerun_patches_only_drifted_auth_settings(self) -> None:
+        self.assertEqual(self.run_bootstrap().returncode, 0)
+        self.kube.namespaces.append("billing")
+        self.kube.service_accounts.append(("billing", "billing-worker"))
+        self.infisical.requests.clear()
+
+        result = self.run_bootstrap()
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(
+            self.infisical.writes(), [("PATCH", "/api/v1/auth/kubernetes-auth/identities/i-1")]
+        )
+        self.assertIn("Updated Kubernetes auth (allowedNames, allowedNamespaces)", result.stderr)
+        self.assertEqual(self.infisical.auth["i-1"]["allowedNamespaces"], "billing,default,demo")
+
+    def test_retries_honour_retry_after_on_same_session(self) -> None:
+        self.infisical.failures = [(503, {"Retry-After": "0"}), (429, {"Retry-After": "0"})]
+        result = self.run_bootstrap()
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(self.infisical.requests[:3], [("GET", "/api/v1/projects")] * 3)
+        self.assertIn("returned 503. Retrying in 0.0s", result.stderr)
+        self.assertEqual(self.infisical.connections, 1)
+
+    def test_missing_admin_secret_fails_before_calling_infisical(self) -> None:
+        del self.kube.secrets["infisical-admin-token"]
+        result = self.run_bootstrap()
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Secret kube-system/infisical-admin-token not found", result.stderr)
+        self.assertEqual(self.infisical.requests, [])
+
+    def test_embedded_configmap_copies_match_script(self) -> None:
+        expected = BOOTSTRAP_SCRIPT.read_text(encoding="utf-8")
+        for env in ("dev", "test", "prod"):
+            path = REPO_ROOT / "clusters" / env / "bootstrap" / "infisical-k8s-auth" / "configmap.yaml"
+            configmap = yaml.safe_load(path.read_text(encoding="utf-8"))
+            self.assertEqual(configmap["data"]["bootstrap.py"], expected, f"{path} is out of date")
+
+
+if __name__ == "__main__":
+    unittest.main()
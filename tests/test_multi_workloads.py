@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import base64
+import gzip
+import hashlib
 import json
 import shutil
 import subprocess
@@ -111,7 +114,9 @@ class MultiWorkloadRenderingTests(unittest.TestCase):
         cls.tmp_dir.mkdir(parents=True, exist_ok=True)
         cls.schema = json.loads(SCHEMA_PATH.read_text(encoding="utf-8"))
 
-    def generate_config(self, payload_fixture_name: str, output_name: str) -> Path:
+    def generate_config(
+        self, payload_fixture_name: str, output_name: str, extra_args: list[str] | None = None
+    ) -> Path:
         payload_path = REPO_ROOT / "tests" / "fixtures" / "payloads" / payload_fixture_name
         output_path = self.tmp_dir / output_name
         cmd = [
@@ -133,6 +138,7 @@ class MultiWorkloadRenderingTests(unittest.TestCase):
             "argocd",
             "--base-domain",
             "example.com",
+            *(extra_args or []),
         ]
         run_checked(cmd)
 
@@ -225,7 +231,7 @@ class MultiWorkloadRenderingTests(unittest.TestCase):
         self.assertEqual(required_terms, [])
 
         csi_volume = find_csi_volume(pod_spec)["csi"]
-        self.assertEqual(csi_volume["volumeAttributes"]["secretProviderClass"], "infisical-demo-queue")
+        self.assertEqual(csi_volume["volumeAttributes"]["secretProviderClass"], "infisical-demo-default")
         dotenv_volume = find_volume_by_name(pod_spec, "demo-queue-dotenv")
         self.assertIsNotNone(dotenv_volume)
         self.assertEqual(dotenv_volume["emptyDir"], {})
@@ -260,7 +266,7 @@ class MultiWorkloadRenderingTests(unittest.TestCase):
 
         csi_volume = find_csi_volume(pod_spec)["csi"]
         self.assertEqual(
-            csi_volume["volumeAttributes"]["secretProviderClass"], "infisical-demo-scheduler"
+            csi_volume["volumeAttributes"]["secretProviderClass"], "infisical-demo-default"
         )
         dotenv_volume = find_volume_by_name(pod_spec, "demo-scheduler-dotenv")
         self.assertIsNotNone(dotenv_volume)
@@ -313,17 +319,533 @@ class MultiWorkloadRenderingTests(unittest.TestCase):
         self.assertEqual(workloads["demo-queue"]["secretsFolder"], "demo-shared")
         self.assertEqual(workloads["demo-scheduler"]["secretsFolder"], "demo-shared")
 
+        for name in ("demo-web", "demo-queue", "demo-scheduler"):
+            self.assertEqual(
+                workloads[name]["csi"]["secretProviderClass"], "infisical-demo-shared"
+            )
+
+    def test_secret_provider_class_per_distinct_secrets_folder(self) -> None:
+        values_file = self.generate_config(
+            "shared_secrets.json",
+            "shared_secrets.generated.yaml",
+            extra_args=[
+                "--infisical-url",
+                "https://infisical.example.com",
+                "--infisical-identity-id",
+                "identity-123",
+                "--infisical-project-id",
+                "project-456",
+            ],
+        )
+
+        generated = yaml.safe_load(values_file.read_text(encoding="utf-8"))
+        global_spec = generated["spec"]["global"]
         self.assertEqual(
-            workloads["demo-web"]["csi"]["secretProviderClass"], "infisical-demo-web"
+            global_spec["infisical"],
+            {
+                "url": "https://infisical.example.com",
+                "identityId": "identity-123",
+                "projectId": "project-456",
+                "envSlug": "dev",
+            },
         )
         self.assertEqual(
-            workloads["demo-queue"]["csi"]["secretProviderClass"], "infisical-demo-queue"
+            global_spec["secretProviderClasses"],
+            [
+                {
+                    "name": "infisical-demo-shared",
+                    "secretsFolder": "demo-shared",
+                    "secretPath": "/demo-shared",
+                    "keys": ["APP_KEY", "DATABASE_URL", "REDIS_URL", "STRIPE_SECRET"],
+                },
+                {
+                    "name": "infisical-demo-scheduler",
+                    "secretsFolder": "demo-scheduler",
+                    "secretPath": "/demo-scheduler",
+                    "keys": ["CRON_TOKEN"],
+                },
+            ],
         )
+
+        docs = render_chart(values_file)
+        classes = {doc["metadata"]["name"]: doc for doc in docs_by_kind(docs, "SecretProviderClass")}
+        self.assertEqual(sorted(classes), ["infisical-demo-scheduler", "infisical-demo-shared"])
+        parameters = classes["infisical-demo-shared"]["spec"]["parameters"]
+        self.assertEqual(parameters["identityId"], "identity-123")
+        self.assertEqual(parameters["envSlug"], "dev")
+        secrets = yaml.safe_load(parameters["secrets"])
         self.assertEqual(
-            workloads["demo-scheduler"]["csi"]["secretProviderClass"],
-            "infisical-demo-scheduler",
+            [(item["secretPath"], item["secretKey"]) for item in secrets],
+            [
+                ("/demo-shared", "APP_KEY"),
+                ("/demo-shared", "DATABASE_URL"),
+                ("/demo-shared", "REDIS_URL"),
+                ("/demo-shared", "STRIPE_SECRET"),
+            ],
+        )
+
+        for kind, name in (("Deployment", "demo-web"), ("Deployment", "demo-queue")):
+            pod_spec = find_doc(docs, kind, name)["spec"]["template"]["spec"]
+            self.assertEqual(
+                find_csi_volume(pod_spec)["csi"]["volumeAttributes"]["secretProviderClass"],
+                "infisical-demo-shared",
+            )
+
+    def test_secret_provider_classes_require_secret_keys(self) -> None:
+        cmd = [
+            sys.executable,
+            str(GENERATOR_SCRIPT),
+            "--deployed-apps-file",
+            str(REPO_ROOT / "tests" / "fixtures" / "payloads" / "web.json"),
+            "--output",
+            str(self.tmp_dir / "web.infisical.generated.yaml"),
+            "--infisical-url",
+            "https://infisical.example.com",
+            "--infisical-identity-id",
+            "identity-123",
+            "--infisical-project-id",
+            "project-456",
+        ]
+        result = subprocess.run(cmd, cwd=str(REPO_ROOT), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("has no secret_keys", result.stderr)
+
+    def test_service_topology_routing_options(self) -> None:
+        values_file = self.generate_config(
+            "service_topology.json", "service_topology.generated.yaml"
+        )
+        generated = yaml.safe_load(values_file.read_text(encoding="utf-8"))
+        services = {item["name"]: item["service"] for item in generated["spec"]["workloads"]}
+        self.assertEqual(services["demo-web"]["trafficDistribution"], "PreferClose")
+        self.assertEqual(services["demo-web"]["sessionAffinity"], "ClientIP")
+        self.assertEqual(services["demo-queue"]["internalTrafficPolicy"], "Local")
+        self.assertTrue(services["demo-grpc"]["headless"])
+
+        docs = render_chart(values_file)
+        web = find_doc(docs, "Service", "demo-web")["spec"]
+        self.assertEqual(web["trafficDistribution"], "PreferClose")
+        self.assertEqual(web["sessionAffinity"], "ClientIP")
+        self.assertEqual(web["sessionAffinityConfig"], {"clientIP": {"timeoutSeconds": 600}})
+        self.assertNotIn("clusterIP", web)
+
+        queue = find_doc(docs, "Service", "demo-queue")["spec"]
+        self.assertEqual(queue["internalTrafficPolicy"], "Local")
+        self.assertNotIn("trafficDistribution", queue)
+        self.assertIsNone(find_doc(docs, "Ingress", "demo-queue"))
+
+        grpc = find_doc(docs, "Service", "demo-grpc")["spec"]
+        self.assertEqual(grpc["clusterIP"], "None")
+        self.assertEqual(grpc["ports"][0]["port"], 50051)
+        self.assertIsNone(find_doc(docs, "Ingress", "demo-grpc"))
+
+    def test_headless_service_rejects_proxy_routing_options(self) -> None:
+        payload = json.loads(
+            (REPO_ROOT / "tests" / "fixtures" / "payloads" / "service_topology.json").read_text(
+                encoding="utf-8"
+            )
+        )
+        payload["workloads"][2]["traffic_distribution"] = "PreferClose"
+        cmd = [
+            sys.executable,
+            str(GENERATOR_SCRIPT),
+            "--deployed-apps-json",
+            json.dumps(payload),
+            "--output",
+            str(self.tmp_dir / "headless-invalid.generated.yaml"),
+        ]
+        result = subprocess.run(cmd, cwd=str(REPO_ROOT), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("traffic_distribution cannot be combined with headless", result.stderr)
+
+    def test_priority_tiers_and_qos_classes_per_preset(self) -> None:
+        values_file = self.generate_config("priority_tiers.json", "priority_tiers.generated.yaml")
+        generated = yaml.safe_load(values_file.read_text(encoding="utf-8"))
+        workloads = {item["name"]: item for item in generated["spec"]["workloads"]}
+        self.assertEqual(
+            workloads["demo-web"]["resources"],
+            {
+                "requests": {"memory": "512Mi", "cpu": "1"},
+                "limits": {"memory": "512Mi", "cpu": "1"},
+            },
+        )
+        self.assertEqual(workloads["demo-web"]["qosClass"], "Guaranteed")
+        # standard leaves limits-only workloads alone, so they stay Guaranteed.
+        self.assertEqual(
+            workloads["demo-queue"]["resources"], {"limits": {"memory": "256Mi", "cpu": "250m"}}
+        )
+        self.assertNotIn("qosClass", workloads["demo-queue"])
+        self.assertEqual(
+            workloads["demo-mailer"]["resources"]["requests"], {"memory": "192Mi", "cpu": "70m"}
+        )
+        # The default tier has no class, so it never waits on the platform manifest.
+        self.assertNotIn("priorityClassName", workloads["demo-mailer"])
+        self.assertEqual(
+            workloads["demo-webhooks"]["priorityClassName"], "infrazero-latency-critical"
+        )
+        self.assertEqual(workloads["demo-webhooks"]["qosClass"], "Guaranteed")
+        self.assertEqual(
+            workloads["demo-scheduler"]["resources"]["requests"], {"memory": "144Mi", "cpu": "50m"}
+        )
+
+        docs = render_chart(values_file)
+        # The classes are shared platform objects, not per-app chart output.
+        self.assertEqual(docs_by_kind(docs, "PriorityClass"), [])
+        manifest = REPO_ROOT / "platform" / "priority-classes" / "priority-classes.yaml"
+        classes = {
+            doc["metadata"]["name"]: doc
+            for doc in yaml.safe_load_all(manifest.read_text(encoding="utf-8"))
+        }
+        self.assertEqual(sorted(classes), ["infrazero-batch", "infrazero-latency-critical"])
+        # Class-less pods (standard tier, platform add-ons) run at 0.
+        self.assertGreater(classes["infrazero-latency-critical"]["value"], 0)
+        self.assertLess(classes["infrazero-batch"]["value"], 0)
+        for priority_class in classes.values():
+            self.assertEqual(priority_class["preemptionPolicy"], "Never")
+            self.assertFalse(priority_class["globalDefault"])
+
+        web = find_doc(docs, "Deployment", "demo-web")["spec"]["template"]["spec"]
+        self.assertEqual(web["priorityClassName"], "infrazero-latency-critical")
+        for container in web["containers"] + web["initContainers"]:
+            resources = container["resources"]
+            self.assertEqual(resources["requests"], resources["limits"], container["name"])
+        queue = find_doc(docs, "Deployment", "demo-queue")["spec"]["template"]["spec"]
+        self.assertNotIn("priorityClassName", queue)
+        self.assertNotIn("requests", queue["containers"][0]["resources"])
+        self.assertNotIn("resources", find_init_container(queue, "dotenv-writer"))
+        cronjob = find_doc(docs, "CronJob", "demo-scheduler")
+        pod_spec = cronjob["spec"]["jobTemplate"]["spec"]["template"]["spec"]
+        self.assertEqual(pod_spec["priorityClassName"], "infrazero-batch")
+
+    def test_guaranteed_qos_class_rejects_requests_below_limits(self) -> None:
+        payload = json.loads(
+            (REPO_ROOT / "tests" / "fixtures" / "payloads" / "priority_tiers.json").read_text(
+                encoding="utf-8"
+            )
+        )
+        payload["workloads"][2]["cpu_request"] = "250m"
+        cmd = [
+            sys.executable,
+            str(GENERATOR_SCRIPT),
+            "--deployed-apps-json",
+            json.dumps(payload),
+            "--output",
+            str(self.tmp_dir / "qos-invalid.generated.yaml"),
+        ]
+        result = subprocess.run(cmd, cwd=str(REPO_ROOT), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn(
+            "qos_class Guaranteed requires requests equal to limits (cpu differ)", result.stderr
+        )
+
+    def test_latency_critical_tier_raises_requests_to_limits(self) -> None:
+        payload = json.loads(
+            (REPO_ROOT / "tests" / "fixtures" / "payloads" / "priority_tiers.json").read_text(
+                encoding="utf-8"
+            )
+        )
+        payload["workloads"][0]["cpu_request"] = "250m"
+        output = self.tmp_dir / "qos-latency-critical.generated.yaml"
+        cmd = [
+            sys.executable,
+            str(GENERATOR_SCRIPT),
+            "--deployed-apps-json",
+            json.dumps(payload),
+            "--output",
+            str(output),
+        ]
+        result = subprocess.run(cmd, cwd=str(REPO_ROOT), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn(
+            "WARNING: Workload 'demo-web': raising cpu requests to the limits because the "
+            "latency-critical tier is Guaranteed; set qos_class: Burstable to keep lower requests",
+            result.stderr,
+        )
+        web = yaml.safe_load(output.read_text(encoding="utf-8"))["spec"]["workloads"][0]
+        self.assertEqual(
+            web["resources"],
+            {
+                "requests": {"memory": "512Mi", "cpu": "1"},
+                "limits": {"memory": "512Mi", "cpu": "1"},
+            },
+        )
+        self.assertEqual(web["qosClass"], "Guaranteed")
+
+        payload["workloads"][0]["qos_class"] = "burstable"
+        cmd[cmd.index("--deployed-apps-json") + 1] = json.dumps(payload)
+        result = subprocess.run(cmd, cwd=str(REPO_ROOT), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        web = yaml.safe_load(output.read_text(encoding="utf-8"))["spec"]["workloads"][0]
+        self.assertEqual(web["resources"]["requests"], {"cpu": "250m", "memory": "384Mi"})
+        self.assertNotIn("qosClass", web)
+
+    def test_burstable_qos_class_rejects_requests_equal_to_limits(self) -> None:
+        payload = json.loads(
+            (REPO_ROOT / "tests" / "fixtures" / "payloads" / "priority_tiers.json").read_text(
+                encoding="utf-8"
+            )
+        )
+        mailer = payload["workloads"][3]
+        mailer["cpu_request"] = "0.25"
+        mailer["memory_request"] = "256Mi"
+        cmd = [
+            sys.executable,
+            str(GENERATOR_SCRIPT),
+            "--deployed-apps-json",
+            json.dumps(payload),
+            "--output",
+            str(self.tmp_dir / "qos-burstable-invalid.generated.yaml"),
+        ]
+        result = subprocess.run(cmd, cwd=str(REPO_ROOT), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn(
+            "Workload 'demo-mailer': qos_class Burstable requires a cpu or memory request below "
+            "its limit",
+            result.stderr,
         )
 
+        # Derived requests that round up to the limits fail the same way.
+        del mailer["cpu_request"], mailer["memory_request"]
+        cmd[cmd.index("--deployed-apps-json") + 1] = json.dumps(payload)
+        result = subprocess.run(
+            cmd + ["--cpu-request-ratio", "1", "--memory-request-ratio", "1"],
+            cwd=str(REPO_ROOT),
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("qos_class Burstable requires a cpu or memory request", result.stderr)
+
+    def test_log_controls_become_pod_labels_and_annotations(self) -> None:
+        values_file = self.generate_config("log_controls.json", "log_controls.generated.yaml")
+        docs = render_chart(values_file)
+
+        web = find_doc(docs, "Deployment", "demo-web")["spec"]["template"]["metadata"]
+        self.assertEqual(web["labels"]["logging.infrazero.io/level"], "info")
+        self.assertEqual(
+            web["annotations"],
+            {
+                "logging.infrazero.io/drop": "(?:GET /healthz)|(?:kube-probe/)",
+                "logging.infrazero.io/sample-rate": "0.25",
+            },
+        )
+
+        queue = find_doc(docs, "Deployment", "demo-queue")["spec"]["template"]["metadata"]
+        self.assertEqual(queue["labels"]["logging.infrazero.io/level"], "warn")
+        self.assertNotIn("annotations", queue)
+
+        cronjob = find_doc(docs, "CronJob", "demo-scheduler")
+        metadata = cronjob["spec"]["jobTemplate"]["spec"]["template"]["metadata"]
+        self.assertEqual(metadata["labels"]["logging.infrazero.io/level"], "info")
+        self.assertNotIn("annotations", metadata)
+
+    def write_runtime_config_payload(self, name: str, files: list[dict]) -> Path:
+        payload = json.loads(
+            (REPO_ROOT / "tests" / "fixtures" / "payloads" / "web.json").read_text(encoding="utf-8")
+        )
+        payload["workloads"][0]["runtime_config_files"] = files
+        path = self.tmp_dir / name
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        return path
+
+    def test_runtime_config_immutable_hashed_compressed_shards(self) -> None:
+        catalog = json.dumps([{"sku": f"item-{i}", "price": i % 97} for i in range(6000)])
+        files = [
+            {"mount_path": "/app/config/app.json", "content": '{"feature": true}\n'},
+            {"key": "catalog.json", "mount_path": "/app/config/catalog.json", "content": catalog},
+            {"mount_path": "/app/config/routes.yaml", "content": "routes:\n" + "  - /a\n" * 6000},
+        ]
+        shard_args = ["--runtime-config-shard-bytes", "60000"]
+        values_file = self.generate_config(
+            str(self.write_runtime_config_payload("runtime.json", files)),
+            "runtime.generated.yaml",
+            extra_args=shard_args,
+        )
+
+        generated = yaml.safe_load(values_file.read_text(encoding="utf-8"))
+        runtime = generated["spec"]["workloads"][0]["runtimeConfig"]
+        self.assertEqual(runtime["mode"], "ui_managed_configmap")
+        by_key = {item["key"]: item for item in runtime["files"]}
+        self.assertEqual(sorted(by_key), ["app.json", "catalog.json", "routes.yaml"])
+        self.assertEqual(by_key["catalog.json"]["encoding"], "gzip")
+        self.assertNotIn("encoding", by_key["routes.yaml"])
+        self.assertEqual(
+            gzip.decompress(base64.b64decode(by_key["catalog.json"]["content"])).decode(), catalog
+        )
+        self.assertEqual(
+            [by_key[key]["shard"] for key in ("app.json", "catalog.json", "routes.yaml")],
+            [0, 0, 1],
+        )
+
+        docs = render_chart(values_file)
+        configmaps = docs_by_kind(docs, "ConfigMap")
+        self.assertEqual(len(configmaps), 2)
+        for configmap in configmaps:
+            self.assertTrue(configmap["immutable"])
+            self.assertRegex(
+                configmap["metadata"]["name"], r"^demo-web-runtime-config-[01]-[0-9a-f]{10}$"
+            )
+        shard0 = next(cm for cm in configmaps if "-config-0-" in cm["metadata"]["name"])
+        self.assertEqual(shard0["data"], {"app.json": '{"feature": true}\n'})
+        self.assertEqual(
+            shard0["binaryData"], {"catalog.json.gz": by_key["catalog.json"]["content"]}
+        )
+
+        pod_spec = find_doc(docs, "Deployment", "demo-web")["spec"]["template"]["spec"]
+        runtime_volume = find_volume_by_name(pod_spec, "demo-web-runtime-config")
+        self.assertEqual(
+            sorted(source["configMap"]["name"] for source in runtime_volume["projected"]["sources"]),
+            sorted(cm["metadata"]["name"] for cm in configmaps),
+        )
+        self.assertEqual(
+            find_volume_by_name(pod_spec, "demo-web-runtime-config-inflated")["emptyDir"], {}
+        )
+        inflate = find_init_container(pod_spec, "runtime-config-inflate")
+        self.assertIn(
+            "gzip -dc '/runtime-config/catalog.json.gz' > '/work/catalog.json'",
+            inflate["command"][2],
+        )
+        container = pod_spec["containers"][0]
+        self.assertEqual(
+            find_mount(container, "/app/config/catalog.json")["name"],
+            "demo-web-runtime-config-inflated",
+        )
+        self.assertEqual(
+            find_mount(container, "/app/config/routes.yaml")["name"], "demo-web-runtime-config"
+        )
+
+        # Only the shard whose content changed gets a new name.
+        files[2]["content"] += "  - /b\n"
+        changed = self.generate_config(
+            str(self.write_runtime_config_payload("runtime-changed.json", files)),
+            "runtime-changed.generated.yaml",
+            extra_args=shard_args,
+        )
+        names = {cm["metadata"]["name"] for cm in configmaps}
+        changed_names = {
+            cm["metadata"]["name"] for cm in docs_by_kind(render_chart(changed), "ConfigMap")
+        }
+        self.assertEqual(len(names & changed_names), 1)
+
+    def test_runtime_config_file_larger_than_a_shard_is_split_into_parts(self) -> None:
+        digest = hashlib.sha256()
+        blocks = []
+        for index in range(4000):
+            digest.update(str(index).encode())
+            blocks.append(digest.hexdigest())
+        dump = "\n".join(blocks)
+        files = [
+            {"mount_path": "/app/config/app.json", "content": '{"feature": true}\n'},
+            {"mount_path": "/app/data/dump.txt", "content": dump},
+        ]
+        values_file = self.generate_config(
+            str(self.write_runtime_config_payload("runtime-parts.json", files)),
+            "runtime-parts.generated.yaml",
+            extra_args=["--runtime-config-shard-bytes", "60000"],
+        )
+        generated = yaml.safe_load(values_file.read_text(encoding="utf-8"))
+        parts = [f for f in generated["spec"]["workloads"][0]["runtimeConfig"]["files"] if f["key"] == "dump.txt"]
+        self.assertGreater(len(parts), 1)
+        self.assertEqual([f["part"] for f in parts], list(range(len(parts))))
+        self.assertTrue(all(len(f["content"]) <= 60000 for f in parts))
+
+        docs = render_chart(values_file)
+        stored: dict[str, str] = {}
+        for configmap in docs_by_kind(docs, "ConfigMap"):
+            self.assertEqual(
+                configmap["metadata"]["annotations"]["argocd.argoproj.io/sync-options"],
+                "Prune=false,ServerSideApply=true",
+            )
+            self.assertEqual(
+                configmap["metadata"]["annotations"]["argocd.argoproj.io/compare-options"],
+                "IgnoreExtraneous",
+            )
+            self.assertEqual(configmap["metadata"]["labels"]["infrazero.io/runtime-config"], "demo-web")
+            stored.update(configmap.get("binaryData", {}))
+        packed = b"".join(base64.b64decode(stored[f"dump.txt.part{i}"]) for i in range(len(parts)))
+        self.assertEqual(gzip.decompress(packed).decode(), dump)
+
+        pod_spec = find_doc(docs, "Deployment", "demo-web")["spec"]["template"]["spec"]
+        inflate = find_init_container(pod_spec, "runtime-config-inflate")
+        sources = " ".join(f"'/runtime-config/dump.txt.part{i}'" for i in range(len(parts)))
+        self.assertIn(f"cat {sources} | gzip -dc > '/work/dump.txt'", inflate["command"][2])
+        mounts = [m for m in pod_spec["containers"][0]["volumeMounts"] if m["mountPath"] == "/app/data/dump.txt"]
+        self.assertEqual(
+            mounts,
+            [
+                {
+                    "name": "demo-web-runtime-config-inflated",
+                    "mountPath": "/app/data/dump.txt",
+                    "subPath": "dump.txt",
+                    "readOnly": True,
+                }
+            ],
+        )
+
+    def test_runtime_config_shards_are_sized_in_bytes(self) -> None:
+        # 63000 UTF-8 bytes but only 21000 characters each; below the
+        # compression threshold, so stored as text.
+        files = [
+            {"mount_path": f"/app/i18n/{index}.txt", "content": "\u6f22" * 21000}
+            for index in range(45)
+        ]
+        values_file = self.generate_config(
+            str(self.write_runtime_config_payload("runtime-utf8.json", files)),
+            "runtime-utf8.generated.yaml",
+        )
+        generated = yaml.safe_load(values_file.read_text(encoding="utf-8"))
+        shard_bytes: dict[int, int] = {}
+        for item in generated["spec"]["workloads"][0]["runtimeConfig"]["files"]:
+            self.assertNotIn("encoding", item)
+            shard_bytes[item["shard"]] = shard_bytes.get(item["shard"], 0) + len(
+                item["content"].encode("utf-8")
+            )
+        self.assertEqual(len(shard_bytes), 4)
+        self.assertLessEqual(max(shard_bytes.values()), 900 * 1024)
+
+        for configmap in docs_by_kind(render_chart(values_file), "ConfigMap"):
+            size = sum(len(value.encode("utf-8")) for value in configmap.get("data", {}).values())
+            self.assertLess(size, 1024 * 1024, configmap["metadata"]["name"])
+
+    def test_runtime_config_rejects_stored_name_collisions(self) -> None:
+        files = [
+            {"key": "catalog.json.gz", "mount_path": "/app/config/catalog.json.gz", "content": "x"},
+            {"key": "catalog.json", "mount_path": "/app/config/catalog.json", "content": "y" * 70000},
+        ]
+        path = self.write_runtime_config_payload("runtime-collision.json", files)
+        cmd = [sys.executable, str(GENERATOR_SCRIPT), "--deployed-apps-file", str(path), "--output",
+               str(self.tmp_dir / "runtime-collision.generated.yaml")]
+        result = subprocess.run(cmd, cwd=str(REPO_ROOT), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn(
+            "runtime config key 'catalog.json' and 'catalog.json.gz' are both stored as "
+            "'catalog.json.gz'",
+            result.stderr,
+        )
+
+    def test_json_output_matches_yaml_in_schema_key_order(self) -> None:
+        yaml_file = self.generate_config("mixed.json", "mixed.ordered.generated.yaml")
+        json_file = self.generate_config(
+            "mixed.json", "mixed.generated.json", extra_args=["--output-format", "json"]
+        )
+        generated = json.loads(json_file.read_text(encoding="utf-8"))
+        self.assertEqual(generated, yaml.safe_load(yaml_file.read_text(encoding="utf-8")))
+
+        # normalize_workload() builds priorityClassName before secretsFolder;
+        # the schema lists it last.
+        workload_order = list(self.schema["definitions"]["workload"]["properties"])
+        for workload in generated["spec"]["workloads"]:
+            self.assertEqual(list(workload), [key for key in workload_order if key in workload])
+            self.assertEqual(list(workload["image"]), ["repository", "tag", "pullPolicy"])
+        global_schema = self.schema["properties"]["spec"]["properties"]["global"]
+        global_values = generated["spec"]["global"]
+        self.assertEqual(
+            list(global_values), [key for key in global_schema["properties"] if key in global_values]
+        )
+
+        docs = render_chart(json_file)
+        self.assertIsNotNone(find_doc(docs, "Deployment", "demo-web"))
+        self.assertIsNotNone(find_doc(docs, "CronJob", "demo-scheduler"))
+
     def test_custom_working_directory_controls_dotenv_mount_path(self) -> None:
         values_file = self.generate_config(
             "custom_working_directory.json",
@@ -346,6 +868,39 @@ class MultiWorkloadRenderingTests(unittest.TestCase):
         workloads = {item["name"]: item for item in generated["spec"]["workloads"]}
         self.assertEqual(workloads["demo-web"]["workingDirectory"], "/srv/demo/current")
 
+    def test_dotenv_writer_mode_and_image_per_workload(self) -> None:
+        values_file = self.generate_config("dotenv_awk.json", "dotenv_awk.generated.yaml")
+
+        generated = yaml.safe_load(values_file.read_text(encoding="utf-8"))
+        workloads = {item["name"]: item for item in generated["spec"]["workloads"]}
+        self.assertEqual(workloads["demo-web"]["dotenv"], {"writer": "awk", "useAppImage": True})
+        self.assertEqual(workloads["demo-scheduler"]["dotenv"], {"writer": "loop"})
+
+        docs = render_chart(values_file)
+
+        deployment = find_doc(docs, "Deployment", "demo-web")
+        self.assertIsNotNone(deployment)
+        init_container = find_init_container(
+            deployment["spec"]["template"]["spec"], "dotenv-writer"
+        )
+        self.assertIsNotNone(init_container)
+        self.assertEqual(init_container["image"], "ghcr.io/example/demo:1.2.3")
+        script = "\n".join(init_container["command"])
+        self.assertIn("awk '", script)
+        self.assertNotIn('basename "$file"', script)
+        self.assertIn('chmod 0444 "$OUT_FILE"', script)
+        self.assertIn({"name": "SECRETS_DIR", "value": "/mnt/secrets"}, init_container["env"])
+        self.assertIn({"name": "OUT_FILE", "value": "/work/.env"}, init_container["env"])
+
+        cronjob = find_doc(docs, "CronJob", "demo-scheduler")
+        self.assertIsNotNone(cronjob)
+        init_container = find_init_container(
+            cronjob["spec"]["jobTemplate"]["spec"]["template"]["spec"], "dotenv-writer"
+        )
+        self.assertIsNotNone(init_container)
+        self.assertEqual(init_container["image"], "alpine:3.20")
+        self.assertIn('for file in "$SECRETS_DIR"/*; do', "\n".join(init_container["command"]))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+import jsonschema
+import yaml
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCHEMA_PATH = REPO_ROOT / "schemas" / "app-config.schema.json"
+GENERATOR_SCRIPT = REPO_ROOT / "scripts" / "generate_app_config.py"
+PLANNER_SCRIPT = REPO_ROOT / "scripts" / "plan_capacity.py"
+FIXTURES = REPO_ROOT / "tests" / "fixtures"
+
+
+def run(cmd: list[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(cmd, cwd=str(REPO_ROOT), capture_output=True, text=True, check=False)
+
+
+def run_checked(cmd: list[str]) -> str:
+    result = run(cmd)
+    if result.returncode != 0:
+        raise AssertionError(
+            f"Command failed ({result.returncode}): {' '.join(cmd)}\n"
+            f"STDOUT:\n{result.stdout}\nSTDERR:\n{result.stderr}"
+        )
+    return result.stdout
+
+
+class CapacityPlanTests(unittest.TestCase):
+    maxDiff = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp_dir = REPO_ROOT / ".tmp" / "tests"
+        cls.tmp_dir.mkdir(parents=True, exist_ok=True)
+        cls.presets_path = cls.tmp_dir / "presets.generated.yaml"
+        cls.config_path = cls.tmp_dir / "requests.generated.yaml"
+        run_checked(
+            [
+                sys.executable,
+                str(PLANNER_SCRIPT),
+                "--config",
+                "config/apps",
+                "--nodes",
+                str(FIXTURES / "capacity" / "nodes.yaml"),
+                "--emit-presets",
+                str(cls.presets_path),
+            ]
+        )
+        run_checked(
+            [
+                sys.executable,
+                str(GENERATOR_SCRIPT),
+                "--deployed-apps-file",
+                str(FIXTURES / "payloads" / "requests.json"),
+                "--output",
+                str(cls.config_path),
+                "--schema",
+                str(SCHEMA_PATH),
+                "--resource-presets-file",
+                str(cls.presets_path),
+            ]
+        )
+
+    def plan(self, *extra: str) -> dict:
+        output = run_checked(
+            [
+                sys.executable,
+                str(PLANNER_SCRIPT),
+                "--config",
+                str(self.config_path),
+                "--nodes",
+                str(FIXTURES / "capacity" / "nodes.yaml"),
+                "--format",
+                "json",
+                *extra,
+            ]
+        )
+        return json.loads(output)
+
+    def test_generator_emits_requests_and_preset_catalog(self) -> None:
+        generated = yaml.safe_load(self.config_path.read_text(encoding="utf-8"))
+        jsonschema.validate(
+            instance=generated, schema=json.loads(SCHEMA_PATH.read_text(encoding="utf-8"))
+        )
+        workloads = {item["name"]: item for item in generated["spec"]["workloads"]}
+
+        self.assertEqual(
+            workloads["demo-web"]["resources"],
+            {
+                "requests": {"memory": "384Mi", "cpu": "125m"},
+                "limits": {"memory": "512Mi", "cpu": "500m"},
+            },
+        )
+        self.assertEqual(workloads["demo-queue"]["resources"], {"preset": "small"})
+        self.assertEqual(
+            generated["spec"]["global"]["resourcePresets"]["small"],
+            {"requests": {"cpu": "125m", "memory": "384Mi"}, "limits": {"cpu": "500m", "memory": "512Mi"}},
+        )
+
+    def test_effective_requests_include_peak_replicas(self) -> None:
+        plan = self.plan()
+        rows = {row["workload"]: row for row in plan["workloads"]}
+
+        self.assertEqual(rows["demo-web"]["replicas"], 2)
+        self.assertEqual(rows["demo-web"]["totalCpuRequest"], 250)
+        self.assertEqual(rows["demo-web"]["totalMemoryLimit"], 1024 * 1024**2)
+        # Preset resolution mirrors the chart's app.resolveResources helper.
+        self.assertEqual(rows["demo-queue"]["cpuRequest"], 125)
+        self.assertEqual(rows["demo-queue"]["memoryLimit"], 512 * 1024**2)
+        # Batch workloads are Burstable: requests derive from limits by ratio.
+        # Allow CronJobs may overlap.
+        self.assertEqual(rows["demo-scheduler"]["cpuRequest"], 50)
+        self.assertEqual(rows["demo-scheduler"]["cpuLimit"], 200)
+        self.assertEqual(rows["demo-scheduler"]["replicas"], 2)
+
+        pool = plan["nodePools"][0]
+        self.assertEqual(pool["cpuAllocatable"], 3000)
+        self.assertEqual(pool["cpuRequest"], 250 + 125 + 100)
+        self.assertEqual(pool["cpuHeadroom"], 3000 - 475)
+        self.assertEqual(plan["workloads"][0]["workload"], "demo-web")
+
+    def test_no_preset_suggestion_without_limits(self) -> None:
+        config = yaml.safe_load(self.config_path.read_text(encoding="utf-8"))
+        config["spec"]["workloads"] = [
+            {"name": "unbounded", "type": "Deployment", "replicas": 1, "image": {"repository": "x", "tag": "1"}}
+        ]
+        config_path = self.tmp_dir / "unbounded.generated.yaml"
+        config_path.write_text(yaml.safe_dump(config, sort_keys=False), encoding="utf-8")
+        plan = json.loads(
+            run_checked(
+                [
+                    sys.executable,
+                    str(PLANNER_SCRIPT),
+                    "--config",
+                    str(config_path),
+                    "--nodes",
+                    str(FIXTURES / "capacity" / "nodes.yaml"),
+                    "--format",
+                    "json",
+                ]
+            )
+        )
+        self.assertIsNone(plan["workloads"][0]["suggestedPreset"])
+
+    def test_shortfall_exit_code_and_anti_affinity_warning(self) -> None:
+        nodes_path = self.tmp_dir / "tiny-nodes.yaml"
+        nodes_path.write_text(
+            yaml.safe_dump(
+                {"nodePools": [{"name": "tiny", "count": 1, "allocatable": {"cpu": "500m", "memory": "1Gi"}}]}
+            ),
+            encoding="utf-8",
+        )
+        result = run(
+            [
+                sys.executable,
+                str(PLANNER_SCRIPT),
+                "--config",
+                str(self.config_path),
+                "--nodes",
+                str(nodes_path),
+                "--fail-on-shortfall",
+            ]
+        )
+        self.assertEqual(result.returncode, 2, result.stderr)
+        self.assertIn("demo/demo-web: 2 replicas need 2 nodes", result.stdout)
+
+    def test_emits_namespace_quota_and_limit_range(self) -> None:
+        quota_path = self.tmp_dir / "quota.generated.yaml"
+        self.plan("--emit-quota", str(quota_path), "--quota-headroom", "0")
+        docs = list(yaml.safe_load_all(quota_path.read_text(encoding="utf-8")))
+
+        quota = next(doc for doc in docs if doc["kind"] == "ResourceQuota")
+        self.assertEqual(quota["metadata"]["namespace"], "demo")
+        self.assertEqual(quota["spec"]["hard"]["requests.cpu"], "480m")
+        self.assertEqual(quota["spec"]["hard"]["limits.cpu"], "1900m")
+        limit_range = next(doc for doc in docs if doc["kind"] == "LimitRange")
+        self.assertEqual(
+            limit_range["spec"]["limits"][0]["defaultRequest"], {"cpu": "125m", "memory": "384Mi"}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import re
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+import yaml
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+GENERATOR_SCRIPT = REPO_ROOT / "scripts" / "generate_app_config.py"
+ENVS = ("dev", "test", "prod")
+
+
+def promtail_snippets(env: str) -> dict:
+    path = REPO_ROOT / "clusters" / env / "applications" / "platform" / "promtail.yaml"
+    application = yaml.safe_load(path.read_text(encoding="utf-8"))
+    values = yaml.safe_load(application["spec"]["source"]["helm"]["values"])
+    return values["config"]["snippets"]
+
+
+def match_selectors(stages: list[dict]) -> list[str]:
+    return [stage["match"]["selector"] for stage in stages if "match" in stage]
+
+
+def level_stages(stages: list[dict]) -> list[dict]:
+    for stage in stages:
+        if stage.get("match", {}).get("selector") == '{log_level_detect="1"}':
+            return stage["match"]["stages"]
+    raise AssertionError("no level detection stage")
+
+
+def detect_level(stages: list[dict], line: str) -> str | None:
+    level = None
+    for stage in level_stages(stages):
+        if "regex" not in stage:
+            continue
+        found = re.search(stage["regex"]["expression"], line)
+        if found:
+            level = found.group("level")
+    return level
+
+
+class PromtailPipelineTests(unittest.TestCase):
+    def test_envs_share_the_same_pipeline(self) -> None:
+        dev = promtail_snippets("dev")
+        for env in ENVS[1:]:
+            self.assertEqual(promtail_snippets(env), dev, env)
+        self.assertNotIn("$", json.dumps(dev["pipelineStages"]))
+
+    def test_relabel_configs_read_generator_metadata(self) -> None:
+        relabels = {
+            item["target_label"]: item["source_labels"]
+            for item in promtail_snippets("dev")["extraRelabelConfigs"]
+        }
+        level = "__meta_kubernetes_pod_label_logging_infrazero_io_level"
+        sample_rate = "__meta_kubernetes_pod_annotation_logging_infrazero_io_sample_rate"
+        self.assertEqual(
+            relabels,
+            {
+                "log_level_floor": [level],
+                "log_drop_regex": ["__meta_kubernetes_pod_annotation_logging_infrazero_io_drop"],
+                "log_sample_rate": [sample_rate],
+                "log_level_detect": [level, sample_rate],
+            },
+        )
+        stages = promtail_snippets("dev")["pipelineStages"]
+        self.assertEqual(stages[-1], {"labeldrop": ["level", *relabels]})
+
+    def test_level_detection_is_scoped_to_pods_with_controls(self) -> None:
+        snippets = promtail_snippets("dev")
+        stages = snippets["pipelineStages"]
+        self.assertEqual([stage for stage in stages if "regex" in stage or "labels" in stage], [])
+        self.assertEqual(len(level_stages(stages)), 3)
+        detect = snippets["extraRelabelConfigs"][-1]
+        # Prometheus relabel regexes are fully anchored; sources join with ";".
+        pattern = re.compile(f"^(?:{detect['regex']})$")
+        for floor, rate, expected in [
+            ("", "", False),
+            ("info", "", True),
+            ("", "0.1", True),
+            ("warn", "0.5", True),
+        ]:
+            self.assertEqual(bool(pattern.match(f"{floor};{rate}")), expected, (floor, rate))
+
+    def test_generated_sample_rates_have_a_sampling_stage(self) -> None:
+        selectors = match_selectors(promtail_snippets("dev")["pipelineStages"])
+        rates = {0.003: "0.01", 0.07: "0.1", 0.3: "0.5", 0.5: "0.5"}
+        payload = {
+            "app_name": "demo",
+            "ghcr_image": "ghcr.io/example/demo:1.2.3",
+            "workloads": [
+                {
+                    "workload_name": f"worker-{index}",
+                    "kind": "Deployment",
+                    "log_sample_rate": rate,
+                    "log_level": level,
+                }
+                for index, (rate, level) in enumerate(
+                    zip(rates, ("debug", "info", "warn", "error"))
+                )
+            ],
+        }
+        output = REPO_ROOT / ".tmp" / "tests" / "log_sampling.generated.yaml"
+        result = subprocess.run(
+            [
+                sys.executable,
+                str(GENERATOR_SCRIPT),
+                "--deployed-apps-json",
+                json.dumps(payload),
+                "--output",
+                str(output),
+            ],
+            cwd=str(REPO_ROOT),
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        workloads = yaml.safe_load(output.read_text(encoding="utf-8"))["spec"]["workloads"]
+        for workload, expected in zip(workloads, rates.values()):
+            rate = workload["podAnnotations"]["logging.infrazero.io/sample-rate"]
+            self.assertEqual(rate, expected)
+            self.assertTrue(any(f'log_sample_rate="{rate}"' in sel for sel in selectors), rate)
+            level = workload["podLabels"]["logging.infrazero.io/level"]
+            self.assertTrue(any(f'log_level_floor="{level}"' in sel for sel in selectors), level)
+
+    def test_level_detection_on_common_formats(self) -> None:
+        stages = promtail_snippets("dev")["pipelineStages"]
+        samples = {
+            "[2024-05-01 10:00:00] production.DEBUG: cache hit": "DEBUG",
+            '{"level":"info","msg":"request served"}': "info",
+            "time=2024-05-01T10:00:00Z level=warn msg=slow query": "warn",
+            "[ERROR] worker crashed": "ERROR",
+            '10.0.0.1 - - "GET /healthz HTTP/1.1" 200 2': None,
+        }
+        for line, expected in samples.items():
+            self.assertEqual(detect_level(stages, line), expected, line)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+import yaml
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCHEMA_PATH = REPO_ROOT / "schemas" / "app-config.schema.json"
+GENERATOR_SCRIPT = REPO_ROOT / "scripts" / "generate_app_config.py"
+RECOMMENDER_SCRIPT = REPO_ROOT / "scripts" / "recommend_resources.py"
+PAYLOADS = REPO_ROOT / "tests" / "fixtures" / "payloads"
+
+
+def run_checked(cmd: list[str]) -> str:
+    result = subprocess.run(cmd, cwd=str(REPO_ROOT), capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        raise AssertionError(
+            f"Command failed ({result.returncode}): {' '.join(cmd)}\n"
+            f"STDOUT:\n{result.stdout}\nSTDERR:\n{result.stderr}"
+        )
+    return result.stdout
+
+
+def range_export(series: list[tuple[dict, list[float]]]) -> dict:
+    return {
+        "status": "success",
+        "data": {
+            "resultType": "matrix",
+            "result": [
+                {
+                    "metric": labels,
+                    "values": [[1700000000 + 30 * i, str(value)] for i, value in enumerate(values)],
+                }
+                for labels, values in series
+            ],
+        },
+    }
+
+
+class RecommendResourcesTests(unittest.TestCase):
+    maxDiff = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp_dir = REPO_ROOT / ".tmp" / "tests"
+        cls.tmp_dir.mkdir(parents=True, exist_ok=True)
+        cls.config_path = cls.tmp_dir / "recommend.generated.yaml"
+        run_checked(
+            [
+                sys.executable,
+                str(GENERATOR_SCRIPT),
+                "--deployed-apps-file",
+                str(PAYLOADS / "mixed.json"),
+                "--output",
+                str(cls.config_path),
+                "--schema",
+                str(SCHEMA_PATH),
+            ]
+        )
+
+        web = {"namespace": "demo", "label_app_kubernetes_io_component": "demo-web"}
+        cpu_series = [
+            ({**web, "pod": "demo-web-a"}, [0.1 + 0.001 * i for i in range(100)]),
+            ({**web, "pod": "demo-web-b"}, [0.05] * 100),
+            # Joined via container name when kube_pod_labels was not part of the query.
+            ({"namespace": "demo", "container": "demo-queue", "pod": "q"}, [0.02] * 5),
+            ({"namespace": "other", "container": "demo-web", "pod": "x"}, [9.0] * 100),
+            ({"namespace": "demo", "container": "sidecar", "pod": "y"}, [1.0] * 100),
+        ]
+        memory_series = [
+            ({**web, "pod": "demo-web-a"}, [200 * 1024**2 + 1024**2 * i for i in range(100)]),
+            ({**web, "pod": "demo-web-b"}, [150 * 1024**2] * 100),
+        ]
+        cls.cpu_path = cls.tmp_dir / "cpu.export.json"
+        cls.memory_path = cls.tmp_dir / "memory.export.json"
+        cls.cpu_path.write_text(json.dumps(range_export(cpu_series)), encoding="utf-8")
+        cls.memory_path.write_text(json.dumps(range_export(memory_series)), encoding="utf-8")
+
+    def recommend(self, *extra: str) -> str:
+        return run_checked(
+            [
+                sys.executable,
+                str(RECOMMENDER_SCRIPT),
+                "--config",
+                str(self.config_path),
+                "--cpu-metrics",
+                str(self.cpu_path),
+                "--memory-metrics",
+                str(self.memory_path),
+                *extra,
+            ]
+        )
+
+    def test_patch_targets_workload_resources(self) -> None:
+        patch = yaml.safe_load(self.recommend("--emit", "patch"))
+
+        self.assertEqual(len(patch), 1)
+        operation = patch[0]
+        self.assertEqual(operation["op"], "add")
+        self.assertEqual(operation["path"], "/spec/workloads/0/resources")
+        resources = operation["value"]
+        # p90 of the pooled pod samples is ~0.18 cores, plus 15% headroom.
+        self.assertEqual(resources["requests"]["cpu"], "210m")
+        self.assertEqual(resources["limits"]["cpu"], "230m")
+        self.assertEqual(resources["requests"]["memory"], "334Mi")
+        self.assertEqual(resources["limits"]["memory"], "374Mi")
+
+    def test_report_lists_skipped_workloads(self) -> None:
+        report = self.recommend()
+        self.assertIn("demo-web", report)
+        self.assertIn("Skipped (not enough samples): demo-queue", report)
+        self.assertIn("Ignored 1 series", report)
+
+    def test_streams_exports_with_many_series(self) -> None:
+        # Well over READ_CHUNK_SIZE, so series straddle chunk boundaries.
+        cpu_export = json.loads(self.cpu_path.read_text(encoding="utf-8"))
+        cpu_export["data"]["result"].extend(
+            {
+                "metric": {"namespace": "demo", "container": "sidecar", "pod": f"sidecar-{i}"},
+                "values": [[1700000000, "0.01"]],
+            }
+            for i in range(60000)
+        )
+        many_path = self.tmp_dir / "cpu.many.export.json"
+        many_path.write_text(json.dumps(cpu_export), encoding="utf-8")
+        report = run_checked(
+            [
+                sys.executable,
+                str(RECOMMENDER_SCRIPT),
+                "--config",
+                str(self.config_path),
+                "--cpu-metrics",
+                str(many_path),
+                "--memory-metrics",
+                str(self.memory_path),
+            ]
+        )
+        self.assertIn("Ignored 60001 series", report)
+        self.assertEqual(report.replace("60001", "1"), self.recommend())
+
+    def test_annotated_payload_feeds_generator(self) -> None:
+        payload_path = self.tmp_dir / "mixed.annotated.json"
+        self.recommend(
+            "--emit", "payload", "--payload", str(PAYLOADS / "mixed.json"), "--output", str(payload_path)
+        )
+        payload = json.loads(payload_path.read_text(encoding="utf-8"))
+        workloads = {item["workload_name"]: item for item in payload["workloads"]}
+        self.assertEqual(workloads["demo-web"]["cpu_request"], "210m")
+        self.assertEqual(workloads["demo-web"]["memory_limit"], "374Mi")
+        self.assertEqual(workloads["demo-web"]["resource_recommendation"]["cpuSamples"], 200)
+        self.assertEqual(workloads["demo-queue"]["cpu_limit"], "250m")
+        self.assertNotIn("resource_recommendation", workloads["demo-queue"])
+
+        output_path = self.tmp_dir / "mixed.annotated.generated.yaml"
+        run_checked(
+            [
+                sys.executable,
+                str(GENERATOR_SCRIPT),
+                "--deployed-apps-file",
+                str(payload_path),
+                "--output",
+                str(output_path),
+                "--schema",
+                str(SCHEMA_PATH),
+            ]
+        )
+        generated = yaml.safe_load(output_path.read_text(encoding="utf-8"))
+        web = generated["spec"]["workloads"][0]
+        # demo-web is latency-critical, so the generator raises requests to the limits.
+        self.assertEqual(web["resources"]["requests"], {"cpu": "230m", "memory": "374Mi"})
+        self.assertEqual(web["qosClass"], "Guaranteed")
+
+
+if __name__ == "__main__":
+    unittest.main()